@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for Scriptotic's own overhead.
+Runs on synthetic multi-speaker audio with stub ASR/alignment/diarization
+backends (benchmarks/stub_backends.py), so it needs no downloads, tokens or
+models. It measures the parts we own:
+  - speaker merge, segment splitting, Transcript packing
+  - VAD pre-pass (speech detection and packing)
+  - worker IPC payload (JSON encode/decode of a transcript)
+  - output formatting for every format
+  - the full pipeline in-process and through the warm worker (IPC)
+If the real tiny Whisper model is already cached, the pipeline is also run
+end-to-end with it. Throughput is compared against benchmarks/baseline.json.
+
+Usage:
+    python benchmarks/run_benchmarks.py                  # run and compare to baseline
+    python benchmarks/run_benchmarks.py --save-baseline  # record this machine's numbers
+    python benchmarks/run_benchmarks.py --minutes 120 --only merge,format
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+bench_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(bench_dir)
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'src', 'core'))
+
+BASELINE_PATH = os.path.join(bench_dir, 'baseline.json')
+STUB_ENGINE = 'benchmarks.stub_engine:StubEngine'
+SPEAKER_NAMES = ['Alice', 'Bob', 'Carol']
+
+
+def measure(fn, repeat=3):
+    """Best-of-repeat wall time and the Python heap peak of one run: (seconds, peak MB, result)"""
+    best = None
+    result = None
+    for i in range(max(1, repeat)):
+        gc.collect()
+        if i == 0:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        if i == 0:
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            tracemalloc.stop()
+        best = elapsed if best is None else min(best, elapsed)
+    return best, peak_mb, result
+
+
+def entry(seconds, items, unit, peak_mb=None):
+    return {"seconds": round(seconds, 6), "throughput": round(items / seconds, 2) if seconds > 0 else None,
+            "unit": unit, "peak_mb": round(peak_mb, 2) if peak_mb is not None else None}
+
+
+# ----------------------------------------------------------------------
+# Benchmarks - each returns {name: entry}
+# ----------------------------------------------------------------------
+def bench_merge(ctx):
+    from stub_backends import StubASR, stub_align, stub_turns, synthetic_audio
+    from speakers import assign_speakers, split_segments
+    from transcript import Transcript
+
+    audio = synthetic_audio(ctx.seconds)
+    aligned = stub_align(StubASR().transcribe(audio)["segments"])
+    turns = stub_turns(ctx.seconds, len(SPEAKER_NAMES))
+    words = sum(len(seg["words"]) for seg in aligned["segments"])
+
+    results = {}
+    seconds, peak, assigned = measure(lambda: assign_speakers(aligned["segments"], turns), ctx.repeat)
+    results["speaker_merge"] = entry(seconds, words, "words/s", peak)
+    seconds, peak, split = measure(lambda: split_segments(assigned), ctx.repeat)
+    results["split_segments"] = entry(seconds, words, "words/s", peak)
+    seconds, peak, transcript = measure(lambda: Transcript.from_segments(split), ctx.repeat)
+    results["transcript_pack"] = entry(seconds, words, "words/s", peak)
+
+    ctx.segments = transcript
+    print(f"  {len(aligned['segments'])} segments, {words} words, {len(turns)} turns -> {len(split)} segments")
+    return results
+
+
+def bench_vad(ctx):
+    from stub_backends import synthetic_audio
+    from vad import SpeechIndex
+    audio = synthetic_audio(ctx.seconds)
+    seconds, peak, index = measure(lambda: SpeechIndex.detect(audio), ctx.repeat)
+    results = {"vad_detect": entry(seconds, ctx.seconds, "audio s/s", peak)}
+    seconds, peak, _ = measure(lambda: index.compact(audio), ctx.repeat)
+    results["vad_compact"] = entry(seconds, ctx.seconds, "audio s/s", peak)
+    print(f"  {len(index)} speech regions, {index.coverage():.0%} of the audio")
+    return results
+
+
+def bench_ipc(ctx):
+    from transcript import Transcript
+    transcript = ctx.segments
+
+    def roundtrip():
+        line = json.dumps({"success": True, "transcript": transcript.to_dict()})
+        return len(line), Transcript.from_dict(json.loads(line)["transcript"])
+
+    seconds, peak, (size, _) = measure(roundtrip, ctx.repeat)
+    print(f"  payload {size / 1024:.0f} KB for {len(transcript)} segments")
+    return {"ipc_payload": entry(seconds, size / (1024 * 1024), "MB/s", peak)}
+
+
+def bench_format(ctx):
+    from scriptotic import OutputFormatter, FORMATS
+    transcript = ctx.segments
+    results = {}
+    for format_type in FORMATS:
+        def run():
+            with open(os.devnull, 'w', encoding='utf-8') as f:
+                OutputFormatter.write(f, format_type, transcript, "Synthetic", ctx.seconds, "stub", "Stub")
+        seconds, peak, _ = measure(run, ctx.repeat)
+        results[f"format_{format_type}"] = entry(seconds, len(transcript), "segments/s", peak)
+    return results
+
+
+def _stage_entries(prefix, metrics):
+    results = {}
+    for name, stage in metrics["stages"].items():
+        if stage.get("cached"):
+            continue
+        results[f"{prefix}_{name}"] = {
+            "seconds": round(stage["wall_s"], 6),
+            "throughput": round(stage["rtf"], 2) if stage.get("rtf") else None,
+            "unit": "audio s/s",
+            "peak_mb": round(stage["peak_rss_mb"], 2) if stage.get("peak_rss_mb") else None
+        }
+    return results
+
+
+def bench_pipeline(ctx):
+    from stub_engine import StubEngine
+    engine = StubEngine(result_store=None, window_seconds=0)
+    start = time.perf_counter()
+    transcript, _ = engine.transcribe_with_speakers(ctx.audio_path, SPEAKER_NAMES)
+    elapsed = time.perf_counter() - start
+    results = _stage_entries("pipeline", engine.last_metrics.as_dict())
+    results["pipeline_total"] = entry(elapsed, ctx.seconds, "audio s/s")
+    ctx.pipeline_seconds = elapsed
+    print(f"  {len(transcript)} segments in {elapsed:.2f}s")
+    return results
+
+
+def bench_worker(ctx):
+    from worker_client import TranscriptionWorker
+    args = ['--engine', STUB_ENGINE, '--no-result-cache', '--window-seconds', '0']
+    start = time.perf_counter()
+    with TranscriptionWorker(worker_args=args) as worker:
+        startup = time.perf_counter() - start
+
+        results = {"worker_startup": entry(startup, 1, "starts/s")}
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            worker.transcribe(ctx.audio_path, 'tiny', speaker_names=SPEAKER_NAMES)
+            results[f"worker_job_{label}"] = entry(time.perf_counter() - start, ctx.seconds, "audio s/s")
+
+    summary = f"  startup {startup:.2f}s, warm job {results['worker_job_warm']['seconds']:.2f}s"
+    if ctx.pipeline_seconds:
+        # Same job in-process vs through the worker: the difference is IPC and (de)serialization
+        overhead = max(results['worker_job_warm']['seconds'] - ctx.pipeline_seconds, 1e-6)
+        results["worker_overhead"] = entry(overhead, 1, "jobs/s")
+        summary += f", overhead vs in-process {overhead:.3f}s"
+    print(summary)
+    return results
+
+
+def _tiny_model_cached():
+    hub = os.getenv("HF_HUB_CACHE") or os.path.join(
+        os.getenv("HF_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "huggingface"), "hub")
+    return os.path.isdir(os.path.join(hub, "models--Systran--faster-whisper-tiny"))
+
+
+def bench_e2e(ctx):
+    if not (ctx.e2e or _tiny_model_cached()):
+        print("  skipped (tiny model not cached; pass --e2e to download it)")
+        return {}
+    from whisperx_engine import WhisperXEngine
+    engine = WhisperXEngine("tiny", result_store=None, window_seconds=0)
+    # Diarization needs a HuggingFace token; without one only ASR + alignment run
+    names = SPEAKER_NAMES if os.getenv("HUGGINGFACE_TOKEN") else None
+    start = time.perf_counter()
+    engine.transcribe_with_speakers(ctx.audio_path, names)
+    elapsed = time.perf_counter() - start
+    results = _stage_entries("e2e_tiny", engine.last_metrics.as_dict())
+    results["e2e_tiny_total"] = entry(elapsed, ctx.seconds, "audio s/s")
+    return results
+
+
+BENCHMARKS = [
+    ("merge", bench_merge),
+    ("vad", bench_vad),
+    ("ipc", bench_ipc),
+    ("format", bench_format),
+    ("pipeline", bench_pipeline),
+    ("worker", bench_worker),
+    ("e2e", bench_e2e),
+]
+
+
+# ----------------------------------------------------------------------
+def compare(results, baseline, tolerance):
+    """Print each result against the baseline; returns the names that regressed"""
+    regressions = []
+    base_results = baseline.get("results", {}) if baseline else {}
+    print(f"\n{'benchmark':<28}{'seconds':>10}{'throughput':>16}  {'unit':<12}{'vs baseline':>12}")
+    for name, current in results.items():
+        base = base_results.get(name)
+        verdict = ""
+        if base and base.get("throughput") and current.get("throughput"):
+            ratio = current["throughput"] / base["throughput"]
+            verdict = f"{ratio:6.2f}x"
+            if ratio < 1 - tolerance:
+                verdict += " SLOWER"
+                regressions.append(name)
+        throughput = f"{current['throughput']:.1f}" if current.get("throughput") else "n/a"
+        print(f"{name:<28}{current['seconds']:>10.4f}{throughput:>16}  {current['unit']:<12}{verdict:>12}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline Scriptotic benchmarks (synthetic audio, stub models)')
+    parser.add_argument('--minutes', type=float, default=30, help='Length of the synthetic recording')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per micro benchmark (best is kept)')
+    parser.add_argument('--only', help=f"Comma-separated subset of: {', '.join(n for n, _ in BENCHMARKS)}")
+    parser.add_argument('--e2e', action='store_true', help='Run the real tiny model even if it must be downloaded')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline file to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Write these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Flag throughput more than this fraction below baseline')
+    parser.add_argument('--strict', action='store_true', help='Exit with status 1 when anything regressed')
+    args = parser.parse_args()
+
+    selected = set(args.only.split(',')) if args.only else None
+    if selected and selected & {"ipc", "format"}:
+        # Formatting and IPC reuse the transcript the merge benchmark builds
+        selected.add("merge")
+    args.seconds = args.minutes * 60
+    args.segments = None
+    args.pipeline_seconds = None
+
+    from stub_backends import make_recording
+    work_dir = os.path.join(tempfile.gettempdir(), 'scriptotic-bench')
+    os.makedirs(work_dir, exist_ok=True)
+    args.audio_path = make_recording(work_dir, args.seconds)
+
+    results = {}
+    failures = []
+    for name, bench in BENCHMARKS:
+        if selected and name not in selected:
+            continue
+        print(f"[{name}]")
+        try:
+            results.update(bench(args))
+        except ImportError as e:
+            print(f"  skipped (missing dependency: {e})")
+        except (Exception, SystemExit) as e:
+            # One broken benchmark (or a module exiting on import) must not end the run
+            print(f"  FAILED: {type(e).__name__}: {e}")
+            failures.append(name)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("minutes") != args.minutes:
+            print(f"\nNOTE: baseline used {baseline.get('minutes')} minutes of audio (now {args.minutes}); "
+                  "throughputs are still comparable, seconds are not")
+    regressions = compare(results, baseline, args.tolerance)
+
+    if args.save_baseline and failures:
+        print(f"\nNot saving a baseline: {', '.join(failures)} failed")
+    elif args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                "machine": {"platform": platform.platform(), "python": platform.python_version(),
+                            "processor": platform.processor() or platform.machine(),
+                            "cpus": os.cpu_count()},
+                "minutes": args.minutes,
+                "recorded": time.strftime("%Y-%m-%d"),
+                "results": results
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) slower than baseline: {', '.join(regressions)}")
+    if failures:
+        print(f"\n{len(failures)} benchmark(s) failed: {', '.join(failures)}")
+    if failures or (regressions and args.strict):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
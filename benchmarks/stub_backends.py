@@ -0,0 +1,106 @@
+"""
+Synthetic audio and stub ASR/alignment/diarization backends for benchmarks.
+The "recording" is a fixed grid of utterances: utterance k spans
+[k * UTTERANCE_SECONDS, (k + 1) * UTTERANCE_SECONDS - GAP_SECONDS] and is
+spoken by speaker k % speakers (shuffled deterministically). The synthetic
+audio puts a tone burst per utterance, and every stub derives its output
+from the same grid, so the pipeline's own code (decode, IPC, JSON, speaker
+merge, splitting, formatting) runs on realistic shapes without any model.
+StubEngine (stub_engine.py) plugs these into the real WhisperXEngine.
+"""
+
+import os
+import wave
+import random
+
+import numpy as np
+
+try:
+    from src.core.audio_buffer import SAMPLE_RATE
+except ImportError:
+    from audio_buffer import SAMPLE_RATE
+
+UTTERANCE_SECONDS = 4.0
+GAP_SECONDS = 0.6
+WORDS_PER_SECOND = 2.5
+SPEAKERS = 3
+
+_VOCABULARY = ("the so and we model data really think going about what yeah right "
+               "question people kind thing actually know point mean time").split()
+
+
+def utterances(duration, speakers=SPEAKERS):
+    """[(start, end, speaker index, text), ...] for a recording of duration seconds"""
+    result = []
+    for k in range(int(duration // UTTERANCE_SECONDS)):
+        rng = random.Random(k)
+        start = k * UTTERANCE_SECONDS
+        end = start + UTTERANCE_SECONDS - GAP_SECONDS
+        speaker = (k + rng.randrange(2)) % speakers
+        words = [rng.choice(_VOCABULARY) for _ in range(int((end - start) * WORDS_PER_SECOND))]
+        result.append((start, end, speaker, " ".join(words)))
+    return result
+
+
+def synthetic_audio(duration, speakers=SPEAKERS, seed=0):
+    """Float32 16 kHz mono audio: a speaker-pitched tone per utterance, light noise in the gaps"""
+    rng = np.random.default_rng(seed)
+    audio = rng.normal(0, 0.003, int(duration * SAMPLE_RATE)).astype(np.float32)
+    for start, end, speaker, _ in utterances(duration, speakers):
+        a, b = int(start * SAMPLE_RATE), int(end * SAMPLE_RATE)
+        t = np.arange(b - a, dtype=np.float32) / SAMPLE_RATE
+        audio[a:b] += 0.2 * np.sin(2 * np.pi * (140 + 60 * speaker) * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    return audio
+
+
+def write_wav(path, audio):
+    """Write float audio as 16-bit PCM WAV (readable by ffmpeg, so the real decode path runs)"""
+    pcm = (np.clip(audio, -1, 1) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(SAMPLE_RATE)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def make_recording(directory, duration, speakers=SPEAKERS):
+    """Write <directory>/synthetic-<duration>s.wav once and return its path"""
+    path = os.path.join(directory, f"synthetic-{int(duration)}s-{speakers}spk.wav")
+    if not os.path.exists(path):
+        write_wav(path, synthetic_audio(duration, speakers))
+    return path
+
+
+class StubASR:
+    """Stands in for a whisperx ASR pipeline; every 5th segment runs across two utterances"""
+
+    def transcribe(self, audio, batch_size=None, **kwargs):
+        duration = len(audio) / float(SAMPLE_RATE)
+        segments = []
+        for start, end, _, text in utterances(duration, SPEAKERS):
+            if segments and int(start // UTTERANCE_SECONDS) % 5 == 1:
+                segments[-1]["end"] = end
+                segments[-1]["text"] += " " + text
+            else:
+                segments.append({"start": start, "end": end, "text": " " + text})
+        return {"segments": segments, "language": "en"}
+
+
+def stub_turns(duration, speakers=SPEAKERS):
+    """Diarization turns ([start, end, label] rows) matching the utterance grid"""
+    return [[start, end, f"SPEAKER_{speaker:02d}"] for start, end, speaker, _ in utterances(duration, speakers)]
+
+
+def stub_align(segments):
+    """Word timestamps spread evenly over each segment (what whisperx.align returns, shape-wise)"""
+    aligned = []
+    for seg in segments:
+        words = seg["text"].split()
+        step = (seg["end"] - seg["start"]) / max(1, len(words))
+        aligned.append(dict(seg, words=[
+            {"word": word, "start": round(seg["start"] + i * step, 3),
+             "end": round(seg["start"] + (i + 0.8) * step, 3), "score": 0.9}
+            for i, word in enumerate(words)
+        ]))
+    return {"segments": aligned, "word_segments": [w for seg in aligned for w in seg["words"]]}
@@ -0,0 +1,39 @@
+"""
+WhisperXEngine with the model-free stub backends from stub_backends.py.
+Everything else - decode, stage metrics, speaker merge, splitting,
+Transcript packing - is the real pipeline. The worker loads it with
+--engine benchmarks.stub_engine:StubEngine. Nothing here imports whisperx or
+torch, so these benchmarks run without the ML stack installed.
+"""
+
+try:
+    from src.core.whisperx_engine import WhisperXEngine
+    from src.core.audio_buffer import SAMPLE_RATE
+    from benchmarks.stub_backends import StubASR, stub_align, stub_turns, SPEAKERS
+except ImportError:
+    from whisperx_engine import WhisperXEngine
+    from audio_buffer import SAMPLE_RATE
+    from stub_backends import StubASR, stub_align, stub_turns, SPEAKERS
+
+
+class StubEngine(WhisperXEngine):
+    """WhisperXEngine whose ASR, alignment and diarization come from the utterance grid"""
+
+    def __init__(self, model_size="stub", device="cpu", **kwargs):
+        super().__init__(model_size=model_size, device="cpu", **kwargs)
+
+    def _set_torch_threads(self, threads):
+        pass  # the stubs don't use torch, so whisperx and torch are never imported
+
+    def _get_asr_model(self, model_size, device, compute_type):
+        return StubASR()
+
+    def preload(self, diarize=False, language="en"):
+        pass
+
+    def _align(self, whisper_result, audio):
+        return stub_align(whisper_result["segments"]), True
+
+    def _diarize(self, audio, speaker_names):
+        speakers = len(speaker_names) if speaker_names and len(speaker_names) >= 2 else SPEAKERS
+        return stub_turns(len(audio) / float(SAMPLE_RATE), speakers), "Stub diarization"
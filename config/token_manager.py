@@ -8,6 +8,12 @@ import json
 import sys
 from pathlib import Path
 
+try:
+    from src.core.file_lock import FileLock, write_json_atomic
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'core'))
+    from file_lock import FileLock, write_json_atomic
+
 class TokenManager:
     def __init__(self):
         # Store config in user's home directory, not in project
@@ -35,24 +41,59 @@ class TokenManager:
                 
         return None
     
-    def set_token(self, token):
-        """Store HuggingFace token in config file"""
-        config = {}
+    def _read_config(self, strict=False):
+        """
+        Load config.json ({} if missing). A corrupt file reads as {} for
+        lookups, but raises with strict=True so it is never written back over.
+        """
         if self.config_file.exists():
             try:
                 with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
+                    return json.load(f)
+            except FileNotFoundError:
                 pass
-        
-        config["huggingface_token"] = token
-        
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=2)
+            except json.JSONDecodeError as e:
+                if strict:
+                    raise Exception(f"{self.config_file} is not valid JSON ({e}); fix or delete it - "
+                                    f"not overwriting it")
+        return {}
+    
+    def _update_config(self, update):
+        """
+        Apply update(config) to config.json. Jobs running side by side all
+        store settings, so the read-modify-write holds a file lock and the new
+        file is renamed into place - a reader never sees a half-written config.
+        """
+        with FileLock(self.config_file):
+            config = self._read_config(strict=True)
+            update(config)
+            write_json_atomic(self.config_file, config, indent=2)
+    
+    def set_token(self, token):
+        """Store HuggingFace token in config file"""
+        self._update_config(lambda config: config.update(huggingface_token=token))
         
         # Set environment variable for current session
         os.environ["HUGGINGFACE_TOKEN"] = token
         
+    def get_setting(self, key, default=None):
+        """Read a non-secret setting (cache sizes, tuned values...) from config.json"""
+        return self._read_config().get(key, default)
+    
+    def set_setting(self, key, value):
+        """Store a setting in config.json alongside the token"""
+        self._update_config(lambda config: config.update({key: value}))
+    
+    def update_setting(self, key, update, default=None):
+        """
+        Replace a setting with update(current value) in one locked step, so
+        concurrent jobs adding entries to the same dict-valued setting don't
+        drop each other's
+        """
+        def apply(config):
+            config[key] = update(config.get(key, default))
+        self._update_config(apply)
+        
     def is_token_configured(self):
         """Check if token is available from any source"""
         return self.get_token() is not None
@@ -0,0 +1,122 @@
+"""
+Decode-once audio buffer shared by every pipeline stage.
+Audio is decoded through ffmpeg a single time into mono 16 kHz float32 PCM
+(the format whisperx.load_audio produces). Optionally the PCM is kept as a
+raw .pcm file and memory-mapped, so long files don't need to live in RAM
+twice and a re-run on the same audio skips ffmpeg entirely.
+"""
+
+import os
+import hashlib
+import subprocess
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, used to key decoded/cached data"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _ffmpeg_cmd(audio_path, output, sr):
+    return [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", audio_path,
+        "-f", "f32le", "-ac", "1", "-acodec", "pcm_f32le", "-ar", str(sr),
+        "-loglevel", "error", "-y", output
+    ]
+
+
+def decode_audio(audio_path, sr=SAMPLE_RATE):
+    """Decode any ffmpeg-readable file into an in-memory float32 array"""
+    try:
+        out = subprocess.run(_ffmpeg_cmd(audio_path, "-", sr), capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+    # bytearray keeps the array writable (torch.from_numpy warns on read-only buffers)
+    return np.frombuffer(bytearray(out), np.float32)
+
+
+def decode_to_pcm(audio_path, pcm_path, sr=SAMPLE_RATE):
+    """Decode into a raw float32 .pcm file (written atomically)"""
+    tmp_path = pcm_path + ".part"
+    try:
+        subprocess.run(_ffmpeg_cmd(audio_path, tmp_path, sr), capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"Failed to load audio: {e.stderr.decode(errors='replace')}") from e
+    os.replace(tmp_path, pcm_path)
+    return pcm_path
+
+
+def open_pcm(pcm_path):
+    """Memory-map a raw float32 .pcm file (copy-on-write, so callers may modify it)"""
+    if os.path.getsize(pcm_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(pcm_path, dtype=np.float32, mode='c')
+
+
+def load_pcm(audio_path, cache_dir=None, sr=SAMPLE_RATE, digest=None):
+    """
+    Return the decoded audio for audio_path as a float32 array.
+    With cache_dir set the PCM is stored as <cache_dir>/<sha256>.pcm and
+    memory-mapped; an existing file for the same content is reused.
+    Pass digest if the caller already hashed the file.
+    """
+    if not cache_dir:
+        return decode_audio(audio_path, sr)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    pcm_path = os.path.join(cache_dir, f"{digest or file_digest(audio_path)}-{sr}.pcm")
+    if not os.path.exists(pcm_path):
+        decode_to_pcm(audio_path, pcm_path, sr)
+    return open_pcm(pcm_path)
+
+
+def duration_of(audio, sr=SAMPLE_RATE):
+    """Length of a decoded buffer in seconds"""
+    return len(audio) / float(sr)
+
+
+def find_quiet_point(audio, target, search=30.0, sr=SAMPLE_RATE, frame=0.05):
+    """
+    Sample index of the lowest-energy frame within +/- search seconds of
+    target (seconds) - a cheap stand-in for a VAD pause, so cuts don't land
+    in the middle of a word.
+    """
+    lo = max(0, int((target - search) * sr))
+    hi = min(len(audio), int((target + search) * sr))
+    frame_len = max(1, int(frame * sr))
+    frames = (hi - lo) // frame_len
+    if frames <= 0:
+        return min(len(audio), max(0, int(target * sr)))
+    window = np.asarray(audio[lo:lo + frames * frame_len], dtype=np.float32)
+    energy = np.square(window).reshape(frames, frame_len).mean(axis=1)
+    return lo + int(np.argmin(energy)) * frame_len + frame_len // 2
+
+
+def plan_windows(audio, window_seconds, search=30.0, sr=SAMPLE_RATE):
+    """
+    Split a buffer into consecutive (start, end) sample ranges of roughly
+    window_seconds each, cut at the quietest point near every boundary.
+    """
+    total = len(audio)
+    window = int(window_seconds * sr)
+    if window <= 0 or total <= window * 1.5:
+        return [(0, total)]
+
+    windows = []
+    start = 0
+    while total - start > window * 1.5:
+        cut = find_quiet_point(audio, (start + window) / sr, min(search, window_seconds / 4.0), sr)
+        windows.append((start, cut))
+        start = cut
+    windows.append((start, total))
+    return windows
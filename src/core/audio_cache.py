@@ -0,0 +1,178 @@
+"""
+On-disk cache of downloaded audio under ~/.scriptotic/audio.
+Entries are keyed by YouTube video ID plus yt-dlp format, checked against
+a stored SHA-256 before reuse, and evicted least-recently-used first once
+the cache grows past its size limit.
+Several jobs may share the cache: the index is only changed under an
+inter-process lock and replaced atomically. A hit doesn't rewrite the
+index - it touches the file, and eviction reads recency from the mtime.
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+from pathlib import Path
+
+try:
+    from src.core.audio_buffer import file_digest
+    from src.core.file_lock import FileLock, write_json_atomic
+except ImportError:
+    from audio_buffer import file_digest
+    from file_lock import FileLock, write_json_atomic
+
+DEFAULT_MAX_MB = 4096
+
+_VIDEO_ID_RE = re.compile(
+    r'(?:youtube(?:-nocookie)?\.com/(?:.*[?&]v=|shorts/|embed/|live/|v/)|youtu\.be/)([A-Za-z0-9_-]{11})'
+)
+
+
+def video_id_from_url(url):
+    """Extract the 11-character YouTube video ID, or None for other URLs"""
+    match = _VIDEO_ID_RE.search(url or "")
+    return match.group(1) if match else None
+
+
+class AudioCache:
+    """Size-bounded LRU cache of downloaded audio files"""
+
+    def __init__(self, cache_dir=None, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = Path(cache_dir) if cache_dir else Path.home() / ".scriptotic" / "audio"
+        self.index_file = self.cache_dir / "index.json"
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _lock(self):
+        """Inter-process lock held around every index read-modify-write"""
+        return FileLock(self.index_file)
+
+    @staticmethod
+    def key_for(url, audio_format):
+        """Cache key for a URL, or None if the URL has no recognisable video ID"""
+        video_id = video_id_from_url(url)
+        if not video_id:
+            return None
+        safe_format = re.sub(r'[^A-Za-z0-9_.-]+', '_', audio_format)
+        return f"{video_id}-{safe_format}"
+
+    # ------------------------------------------------------------------
+    # Index persistence
+    # ------------------------------------------------------------------
+    def _load_index(self):
+        if self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError):
+                pass
+        return {"entries": {}}
+
+    def _save_index(self, index):
+        # Atomic, so neither a crash nor a concurrent reader ever sees a partial index
+        write_json_atomic(self.index_file, index, indent=2)
+
+    def _last_used(self, entry):
+        # Hits touch the file instead of rewriting the index
+        try:
+            return max(entry["last_used"], (self.cache_dir / entry["file"]).stat().st_mtime)
+        except OSError:
+            return entry["last_used"]
+
+    def _drop(self, index, key):
+        entry = index["entries"].pop(key, None)
+        if entry:
+            path = self.cache_dir / entry["file"]
+            if path.exists():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+    def _evict(self, index, keep=None):
+        """Remove least-recently-used entries until the cache fits its size limit"""
+        entries = index["entries"]
+        # Files no entry points at (left by an interrupted job) would never be evicted
+        referenced = {entry["file"] for entry in entries.values()}
+        for path in self.cache_dir.iterdir():
+            if path.is_file() and path.name not in referenced and not path.name.startswith("index.json"):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+        total = sum(e["size"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: self._last_used(entries[k])):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]["size"]
+            self._drop(index, key)
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def get(self, url, audio_format):
+        """Return (path, info) for a verified cache hit, otherwise None"""
+        key = self.key_for(url, audio_format)
+        if not key:
+            return None
+
+        # The index is always complete on disk, so a lookup needs no lock
+        entry = self._load_index()["entries"].get(key)
+        if not entry:
+            return None
+
+        path = self.cache_dir / entry["file"]
+        try:
+            valid = path.stat().st_size == entry["size"] and file_digest(path) == entry["sha256"]
+        except OSError:
+            valid = False
+        if not valid:
+            # Truncated or corrupted file - forget it (unless it was replaced meanwhile) and download again
+            with self._lock():
+                index = self._load_index()
+                if index["entries"].get(key, {}).get("sha256") == entry["sha256"]:
+                    self._drop(index, key)
+                    self._save_index(index)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return str(path), entry
+
+    def put(self, url, audio_format, file_path, title=None, duration=None):
+        """
+        Move a freshly downloaded file into the cache and return its new path.
+        URLs without a video ID are not cached and the file is left in place.
+        """
+        key = self.key_for(url, audio_format)
+        if not key:
+            return file_path
+
+        # Hash before taking the lock; other jobs only wait for the index update
+        size, sha256 = os.path.getsize(file_path), file_digest(file_path)
+        with self._lock():
+            index = self._load_index()
+            self._drop(index, key)
+
+            name = key + os.path.splitext(file_path)[1]
+            cached_path = self.cache_dir / name
+            shutil.move(file_path, cached_path)
+
+            now = time.time()
+            index["entries"][key] = {
+                "file": name,
+                "size": size,
+                "sha256": sha256,
+                "title": title,
+                "duration": duration,
+                "added": now,
+                "last_used": now
+            }
+            self._evict(index, keep=key)
+            self._save_index(index)
+            return str(cached_path)
@@ -0,0 +1,218 @@
+"""
+Adaptive settings for the Whisper (ASR) stage.
+The batch-size tuner times increasing batch sizes, each on just enough audio
+to fill one batch (batch size x 30 s) and within a small overall time cap,
+keeps the fastest one that leaves enough memory free, and
+stores it in ~/.scriptotic/config.json per (host, model size, device,
+compute type). Later runs on that host start straight from the stored size.
+An out-of-memory error during a real job halves the batch size, retries,
+and lowers the stored value so the next job doesn't hit the same wall.
+The compute-type tuner does the same on CPU for the CTranslate2 precision
+(int8, int8_float32, float32), whose relative speed depends on the CPU.
+"""
+
+import time
+import platform
+
+try:
+    from src.core.audio_buffer import SAMPLE_RATE
+except ImportError:
+    from audio_buffer import SAMPLE_RATE
+
+SETTING = "asr_batch_size"
+COMPUTE_SETTING = "cpu_compute_type"
+CPU_COMPUTE_TYPES = ("int8", "int8_float32", "float32")
+CHUNK_SECONDS = 30           # whisperx batches VAD chunks of up to 30 s
+CANDIDATES = {"cuda": (1, 2, 4, 8, 16, 32), "cpu": (1, 2, 4, 8, 16)}
+MIN_HEADROOM = 0.15          # keep this fraction of memory free
+MIN_GAIN = 1.05              # a larger batch must be at least 5% faster to be worth it
+CALIBRATION_BUDGET = 60      # wall seconds calibration may spend before it settles for the best so far
+
+
+def default_batch_size(device):
+    """Conservative fixed size used before anything is tuned"""
+    return 4 if device == "cuda" else 2
+
+
+def is_out_of_memory(error):
+    """True for CUDA, CTranslate2 and host out-of-memory errors"""
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return "out of memory" in message or "cuda_error_out_of_memory" in message
+
+
+def _settings():
+    try:
+        from config.token_manager import TokenManager
+    except ImportError:
+        from token_manager import TokenManager
+    return TokenManager()
+
+
+def memory_headroom(device):
+    """Fraction of device (or host) memory still free, or None if it can't be measured"""
+    try:
+        if device == "cuda":
+            import torch
+            free, total = torch.cuda.mem_get_info()
+            return free / float(total)
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.available / float(memory.total)
+    except Exception:
+        return None
+
+
+def release_memory(device):
+    """Return cached GPU memory to the driver after an out-of-memory error"""
+    if device == "cuda":
+        try:
+            import torch
+            torch.cuda.empty_cache()
+        except Exception:
+            pass
+
+
+def _calibration_slice(audio, seconds):
+    # Skip the first tenth of the recording (intros are often silence or music)
+    length = int(seconds * SAMPLE_RATE)
+    start = min(int(len(audio) * 0.1), len(audio) - length)
+    return audio[start:start + length]
+
+
+class _TunedSetting:
+    """One tuned value per key, kept in a dict-valued config.json setting"""
+    setting = None
+    field = None
+
+    def __init__(self, key, settings=None):
+        self.key = f"{platform.node()}|{key}"
+        self.settings = settings or _settings()
+
+    def _entries(self):
+        return self.settings.get_setting(self.setting, {}) or {}
+
+    def stored(self):
+        """The tuned value for this host/model, or None"""
+        entry = self._entries().get(self.key)
+        return entry[self.field] if entry else None
+
+    def store(self, value, **info):
+        entry = dict(info, updated=time.strftime("%Y-%m-%d"), **{self.field: value})
+        try:
+            self.settings.update_setting(self.setting, lambda entries: dict(entries or {}, **{self.key: entry}))
+        except Exception as e:
+            # The value still applies to this job; it just isn't remembered
+            print(f"DEBUG: Could not store {self.setting}: {e}")
+
+
+class BatchSizeTuner(_TunedSetting):
+    """Chooses, remembers and backs off the ASR batch size for one model on one host"""
+    setting = SETTING
+    field = "batch_size"
+
+    def __init__(self, model_size, device, compute_type, settings=None):
+        super().__init__(f"{model_size}|{device}|{compute_type}", settings)
+        self.device = device
+
+    def batch_size(self):
+        """Stored size if tuned, otherwise the conservative default"""
+        return self.stored() or default_batch_size(self.device)
+
+    def record_oom(self, batch_size):
+        """A job ran out of memory at batch_size; never start above half of it again"""
+        reduced = max(1, batch_size // 2)
+        if (self.stored() or batch_size) > reduced:
+            self.store(reduced, reason="out of memory")
+        return reduced
+
+    def calibrate(self, transcribe, audio, log=None):
+        """
+        Time transcribe(audio_slice, batch_size) for growing batch sizes,
+        each on batch_size chunks of audio (at least two), and store the
+        best. Stops growing when throughput no longer improves, memory
+        headroom gets low, memory runs out, or the next size couldn't be
+        timed within CALIBRATION_BUDGET seconds. Returns the chosen size (None if the audio is too
+        short to tell).
+        """
+        candidates = CANDIDATES.get(self.device, CANDIDATES["cpu"])
+        seconds = min(len(audio) / float(SAMPLE_RATE), CHUNK_SECONDS * candidates[-1])
+        if seconds < CHUNK_SECONDS * 2:
+            return None
+        calibration = _calibration_slice(audio, seconds)
+        calibration_started = time.perf_counter()
+
+        # Warm-up: the first call pays one-off costs (VAD model, CUDA kernels)
+        transcribe(calibration[:CHUNK_SECONDS * SAMPLE_RATE], 1)
+
+        best, best_rate = None, 0.0
+        for batch_size in candidates:
+            if batch_size > max(1, seconds // CHUNK_SECONDS):
+                break  # not enough chunks in the slice to fill the batch
+            part_seconds = CHUNK_SECONDS * max(2, batch_size)
+            remaining = CALIBRATION_BUDGET - (time.perf_counter() - calibration_started)
+            if best is not None and part_seconds / best_rate > remaining:
+                break  # this size wouldn't be measured within the budget at the best rate so far
+            started = time.perf_counter()
+            try:
+                transcribe(calibration[:int(part_seconds * SAMPLE_RATE)], batch_size)
+            except Exception as e:
+                if not is_out_of_memory(e):
+                    raise
+                release_memory(self.device)
+                break
+            rate = min(part_seconds, seconds) / (time.perf_counter() - started)
+            headroom = memory_headroom(self.device)
+            if log:
+                headroom_text = f", {headroom:.0%} memory free" if headroom is not None else ""
+                log(f"batch size {batch_size}: {rate:.1f}x real time{headroom_text}")
+            if best is not None and rate < best_rate * MIN_GAIN:
+                break
+            best, best_rate = batch_size, rate
+            if headroom is not None and headroom < MIN_HEADROOM:
+                break
+        if best is not None:
+            self.store(best, throughput=round(best_rate, 2))
+        return best
+
+
+class ComputeTypeTuner(_TunedSetting):
+    """Picks the fastest CPU precision for one model on one host (by measurement, not by guess)"""
+    setting = COMPUTE_SETTING
+    field = "compute_type"
+
+    def __init__(self, model_size, settings=None):
+        super().__init__(model_size, settings)
+
+    def calibrate(self, load, transcribe, audio, log=None):
+        """
+        load(compute_type) -> model; transcribe(model, audio_slice) is timed
+        on the same slice for every CPU compute type. Stores and returns the
+        fastest (None if the audio is too short to tell).
+        """
+        seconds = min(len(audio) / float(SAMPLE_RATE), CHUNK_SECONDS * 4)
+        if seconds < CHUNK_SECONDS * 2:
+            return None
+        calibration = _calibration_slice(audio, seconds)
+
+        best, best_rate = None, 0.0
+        for compute_type in CPU_COMPUTE_TYPES:
+            try:
+                model = load(compute_type)
+            except Exception as e:
+                # Not every CPU/CTranslate2 build supports every type
+                if log:
+                    log(f"{compute_type}: unavailable ({e})")
+                continue
+            transcribe(model, calibration[:CHUNK_SECONDS * SAMPLE_RATE])  # warm-up
+            started = time.perf_counter()
+            transcribe(model, calibration)
+            rate = seconds / (time.perf_counter() - started)
+            if log:
+                log(f"{compute_type}: {rate:.1f}x real time")
+            if rate > best_rate:
+                best, best_rate = compute_type, rate
+        if best is not None:
+            self.store(best, throughput=round(best_rate, 2))
+        return best
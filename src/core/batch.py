@@ -0,0 +1,198 @@
+"""
+Batch transcription support.
+A batch source is a text file of URLs, a playlist/channel URL or a
+directory of local audio. Items flow through download, decode, transcribe
+and format stages that each run on their own thread, connected by small
+bounded queues, so the next item downloads and decodes while the current
+one is being transcribed. Per-item status is kept in a JSON manifest next
+to the outputs, so an interrupted batch picks up where it stopped.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import queue
+import hashlib
+import threading
+import subprocess
+
+try:
+    from src.core.audio_cache import video_id_from_url
+except ImportError:
+    from audio_cache import video_id_from_url
+
+AUDIO_EXTENSIONS = ('.webm', '.m4a', '.mp4', '.opus', '.mp3', '.wav', '.flac', '.ogg', '.aac', '.mkv')
+MANIFEST_NAME = "batch_manifest.json"
+
+_DONE = object()
+
+
+def _safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', value).strip('._') or "item"
+
+
+def expand_playlist(url):
+    """Video URLs of a playlist or channel (flat listing, nothing is downloaded); [] if url is a single video"""
+    cmd = [sys.executable, '-m', 'yt_dlp', '--flat-playlist', '--dump-json', '--quiet', url]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    if result.returncode != 0:
+        raise Exception(f"yt-dlp could not list {url}: {result.stderr.strip()}")
+    entries = [json.loads(line) for line in result.stdout.splitlines() if line.startswith('{')]
+    urls = []
+    for entry in entries:
+        if entry.get("_type") not in ("url", "url_transparent"):
+            return []  # a single video describes itself, not a list of entries
+        entry_url = entry.get("url") or entry.get("webpage_url")
+        if entry_url and not entry_url.startswith("http") and entry.get("id"):
+            entry_url = f"https://www.youtube.com/watch?v={entry['id']}"
+        if entry_url:
+            urls.append(entry_url)
+    return urls
+
+
+def expand_source(source):
+    """
+    The list of items (URLs or audio file paths) a batch source stands for:
+    every audio file in a directory, every line of a URL list (blank lines
+    and # comments skipped), the videos of a playlist/channel, or the
+    source itself.
+    """
+    if os.path.isdir(source):
+        # Absolute paths, so the manifest still matches when resumed from another directory
+        source = os.path.abspath(source)
+        return [os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.lower().endswith(AUDIO_EXTENSIONS) and os.path.isfile(os.path.join(source, name))]
+    if os.path.isfile(source) and not source.lower().endswith(AUDIO_EXTENSIONS):
+        items = []
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    items.extend(expand_source(line))
+        return items
+    if source.startswith(('http://', 'https://')) and not video_id_from_url(source):
+        try:
+            return expand_playlist(source) or [source]
+        except Exception:
+            return [source]  # not listable; downloading it will report the real error
+    if os.path.isfile(source):
+        return [os.path.abspath(source)]
+    return [source]
+
+
+def item_name(source):
+    """Stable output base name for an item: the YouTube video ID, the file name, or a hash of the URL"""
+    if os.path.isfile(source):
+        return _safe_name(os.path.splitext(os.path.basename(source))[0])
+    video_id = video_id_from_url(source)
+    if video_id:
+        return video_id
+    return "url-" + hashlib.sha1(source.encode('utf-8')).hexdigest()[:12]
+
+
+class BatchManifest:
+    """
+    Per-item status of a batch, saved atomically after every change.
+    Items are keyed by their source; status moves through pending,
+    downloaded, decoded, transcribed and done (or failed, with the error).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.items = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.items = json.load(f).get("items", {})
+            except (json.JSONDecodeError, OSError):
+                self.items = {}
+
+    def add(self, sources):
+        """Register sources (keeping the state of ones seen before); returns [(source, name)] in order"""
+        added = []
+        with self._lock:
+            used = {entry["name"] for entry in self.items.values()}
+            for source in sources:
+                entry = self.items.get(source)
+                if entry is None:
+                    name = base = item_name(source)
+                    suffix = 2
+                    while name in used:
+                        name = f"{base}-{suffix}"
+                        suffix += 1
+                    used.add(name)
+                    entry = self.items[source] = {"name": name, "status": "pending"}
+                added.append((source, entry["name"]))
+            self._save()
+        return added
+
+    def get(self, source):
+        with self._lock:
+            return dict(self.items.get(source, {}))
+
+    def update(self, source, **fields):
+        with self._lock:
+            entry = self.items.setdefault(source, {"name": item_name(source)})
+            entry.update(fields)
+            entry["updated"] = time.time()
+            self._save()
+
+    def is_done(self, source):
+        """True if the item finished and all its outputs are still there"""
+        entry = self.get(source)
+        return entry.get("status") == "done" and all(os.path.exists(p) for p in entry.get("outputs", []))
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for entry in self.items.values():
+                counts[entry.get("status")] = counts.get(entry.get("status"), 0) + 1
+            return counts
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"items": self.items}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def run_pipeline(items, stages, queue_size=1, on_error=None):
+    """
+    Push items through stages = [(name, fn), ...], one thread per stage.
+    Each fn(item) returns the item for the next stage (None drops it).
+    Stages are joined by queues holding at most queue_size items, which
+    bounds how far early stages (downloads) run ahead of the slow one.
+    If a stage raises, on_error(item, name, exception) is called and the
+    item is dropped; the rest of the batch continues.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages[1:]]
+
+    def run_stage(index, name, fn):
+        source = iter(items) if index == 0 else iter(queues[index - 1].get, _DONE)
+        out = queues[index] if index < len(queues) else None
+        try:
+            for item in source:
+                try:
+                    result = fn(item)
+                except Exception as e:
+                    if on_error:
+                        on_error(item, name, e)
+                    continue
+                if result is not None and out is not None:
+                    out.put(result)
+        finally:
+            if out is not None:
+                out.put(_DONE)
+
+    threads = [threading.Thread(target=run_stage, args=(i, name, fn), name=f"batch-{name}", daemon=True)
+               for i, (name, fn) in enumerate(stages)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        # Join with a timeout so Ctrl+C still reaches the main thread
+        while thread.is_alive():
+            thread.join(0.5)
@@ -0,0 +1,99 @@
+"""
+Safe shared files for jobs running side by side.
+FileLock serialises a read-modify-write of a shared file (config.json, the
+audio cache index) across processes and threads, using a companion
+".lock" file. write_json_atomic writes to a temp file with a name unique to
+the writer and renames it over the target, so readers only ever see a
+complete file.
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+def _try_lock(fd):
+    if sys.platform == "win32":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def _unlock(fd):
+    if sys.platform == "win32":
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class FileLock:
+    """Exclusive lock on path + ".lock" for the duration of a with-block"""
+
+    def __init__(self, path, timeout=60, poll=0.05):
+        self.path = str(path) + ".lock"
+        self.timeout = timeout
+        self.poll = poll
+        self.fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                _try_lock(fd)
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    os.close(fd)
+                    raise Exception(f"Timed out after {self.timeout}s waiting for {self.path}")
+                time.sleep(self.poll)
+        self.fd = fd
+        return self
+
+    def release(self):
+        if self.fd is not None:
+            try:
+                _unlock(self.fd)
+            finally:
+                os.close(self.fd)
+                self.fd = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def write_json_atomic(path, data, **dump_options):
+    """Write data as JSON to a writer-unique temp file next to path, then rename it over path"""
+    path = str(path)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_options)
+        for attempt in range(20):
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                # Windows: a reader has the target open; it closes it again shortly
+                if attempt == 19:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
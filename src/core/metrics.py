@@ -0,0 +1,123 @@
+"""
+Per-stage pipeline metrics.
+Each stage (download, decode, VAD, model load, draft, transcribe, align,
+diarize, merge, post-process, format) records wall time, CPU time and the process's peak
+RSS when it finished. With the audio length known, every stage also gets a
+real-time factor: audio seconds handled per wall-clock second.
+The worker returns these in its JSON result and the caller adds the stages
+it runs itself (download, format) before logging them.
+"""
+
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+# Order stages are reported in
+STAGES = ("download", "decode", "vad", "model_load", "draft", "transcribe", "align",
+          "diarize", "merge", "post_process", "format")
+
+
+def _cpu_seconds():
+    # Includes finished child processes, so sharded transcription is counted
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unavailable)"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return None
+
+
+class StageMetrics:
+    """
+    Thread-safe collection of stage timings for one job. Stages that run
+    concurrently (align and diarize) share the process-wide CPU counter, so
+    their CPU times overlap.
+    """
+
+    def __init__(self, audio_seconds=None):
+        self.audio_seconds = audio_seconds
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block; yields the stage record so callers can annotate it"""
+        extra = {}
+        wall_start = time.perf_counter()
+        cpu_start = _cpu_seconds()
+        try:
+            yield extra
+        finally:
+            self.record(name, time.perf_counter() - wall_start, _cpu_seconds() - cpu_start, **extra)
+
+    def record(self, name, wall_s, cpu_s=None, **extra):
+        """Add a measurement; a stage measured twice accumulates"""
+        with self._lock:
+            entry = self.stages.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0})
+            entry["wall_s"] += wall_s
+            if cpu_s is not None:
+                entry["cpu_s"] += cpu_s
+            entry["peak_rss_mb"] = peak_rss_mb()
+            entry.update(extra)
+
+    def merge(self, data):
+        """Fold in metrics from another StageMetrics.as_dict() (e.g. the worker's)"""
+        if not data:
+            return self
+        if self.audio_seconds is None:
+            self.audio_seconds = data.get("audio_seconds")
+        for name, entry in data.get("stages", {}).items():
+            extra = {k: v for k, v in entry.items() if k not in ("wall_s", "cpu_s", "peak_rss_mb", "rtf")}
+            self.record(name, entry["wall_s"], entry.get("cpu_s"), **extra)
+            # Peak RSS belongs to the process that ran the stage
+            self.stages[name]["peak_rss_mb"] = entry.get("peak_rss_mb")
+        return self
+
+    def as_dict(self):
+        with self._lock:
+            ordered = sorted(self.stages.items(),
+                             key=lambda item: STAGES.index(item[0]) if item[0] in STAGES else len(STAGES))
+            stages = {}
+            for name, entry in ordered:
+                entry = dict(entry)
+                entry["rtf"] = (self.audio_seconds / entry["wall_s"]
+                                if self.audio_seconds and entry["wall_s"] > 0 else None)
+                stages[name] = entry
+        return {
+            "audio_seconds": self.audio_seconds,
+            "stages_wall_s": sum(entry["wall_s"] for entry in stages.values()),  # align/diarize overlap
+            "stages": stages
+        }
+
+    def format_lines(self):
+        """Human-readable table, one line per stage"""
+        data = self.as_dict()
+        lines = []
+        for name, entry in data["stages"].items():
+            rss = f"{entry['peak_rss_mb']:.0f} MB" if entry.get("peak_rss_mb") is not None else "n/a"
+            rtf = f"{entry['rtf']:.1f}x" if entry.get("rtf") else "n/a"
+            cached = " (cached)" if entry.get("cached") else ""
+            lines.append(f"METRICS: {name:<12} wall {entry['wall_s']:8.2f}s  cpu {entry['cpu_s']:8.2f}s  "
+                         f"peak rss {rss:>9}  rtf {rtf:>8}{cached}")
+        audio = f"{data['audio_seconds']:.1f}s" if data["audio_seconds"] else "unknown"
+        lines.append(f"METRICS: sum          wall {data['stages_wall_s']:8.2f}s  audio {audio}")
+        return lines
+
+    def log(self, out=None):
+        for line in self.format_lines():
+            print(line, file=out or sys.stderr)
@@ -0,0 +1,129 @@
+"""
+Process-wide registry of loaded models.
+ASR, alignment and diarization models are cached under
+(kind, name, device, compute_type, language, threads), so a long-lived worker
+loads each one once no matter how many jobs or engines ask for it. A model
+loaded again with a different CPU thread count replaces the old copy. When the
+estimated size of everything loaded exceeds the memory budget, the least
+recently used models are dropped.
+"""
+
+import os
+import gc
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET_MB = 6144
+
+# Whisper model sizes, smallest (fastest) first
+MODEL_SIZES = ("tiny", "base", "small", "medium", "large")
+
+# Rough footprint of CTranslate2 Whisper checkpoints at float16, in MB
+# (int8 is about half). CTranslate2 models don't expose their tensors.
+_WHISPER_MB = {"tiny": 75, "base": 145, "small": 485, "medium": 1530, "large": 3100}
+_DEFAULT_MB = 512
+
+
+def estimate_model_bytes(model, kind, name, compute_type=None):
+    """Best-effort memory estimate for a loaded model"""
+    if isinstance(model, tuple):  # (align model, metadata)
+        model = model[0]
+    parameters = getattr(model, "parameters", None)
+    if callable(parameters):
+        try:
+            return sum(p.numel() * p.element_size() for p in parameters())
+        except Exception:
+            pass
+    if kind == "asr":
+        size_mb = _WHISPER_MB.get(name.split("-")[0].split(".")[0], _DEFAULT_MB)
+        if compute_type and compute_type.startswith("int8"):
+            size_mb //= 2
+        return size_mb * 1024 * 1024
+    return _DEFAULT_MB * 1024 * 1024
+
+
+class ModelRegistry:
+    """LRU cache of loaded models bounded by an estimated memory budget"""
+
+    def __init__(self, budget_mb=DEFAULT_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._models = OrderedDict()   # key -> (model, size_bytes)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, kind, name, loader, device=None, compute_type=None, language=None, threads=None):
+        """Return the cached model for this key, calling loader() on a miss"""
+        key = (kind, name, device, compute_type, language, threads)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+
+        # Per-key lock: concurrent stages can load different models in
+        # parallel, but the same model is never loaded twice
+        with self._key_lock(key):
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+
+            model = loader()
+            size = estimate_model_bytes(model, kind, name, compute_type)
+
+            with self._lock:
+                stale = [k for k in self._models if threads is not None and k[:5] == key[:5]]
+                for k in stale:
+                    del self._models[k]  # same model with its old thread pool
+                self._models[key] = (model, size)
+                self._evict(keep=key)
+            if stale:
+                self._release_memory()
+            return model
+
+    def _evict(self, keep=None):
+        total = sum(size for _, size in self._models.values())
+        evicted = False
+        for key in list(self._models):
+            if total <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            _, size = self._models.pop(key)
+            total -= size
+            evicted = True
+        if evicted:
+            self._release_memory()
+
+    @staticmethod
+    def _release_memory():
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def drop(self, kind, name, device=None, compute_type=None, language=None, threads=None):
+        """Unload one model (e.g. a precision that lost calibration); no-op if it isn't loaded"""
+        with self._lock:
+            dropped = self._models.pop((kind, name, device, compute_type, language, threads), None)
+        if dropped is not None:
+            self._release_memory()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+        self._release_memory()
+
+    def loaded(self):
+        """Keys and estimated sizes (MB) of everything currently loaded, oldest first"""
+        with self._lock:
+            return [(key, size / (1024 * 1024)) for key, (_, size) in self._models.items()]
+
+
+REGISTRY = ModelRegistry(float(os.getenv("SCRIPTOTIC_MODEL_BUDGET_MB", DEFAULT_BUDGET_MB)))
@@ -0,0 +1,141 @@
+"""
+Deadline-aware choice of the Whisper model size.
+Every finished job records how fast its model ran on this host: the real-time
+factor (audio seconds per second of transcription, alignment and
+diarization) and the cold model load time, per (host, model size, device,
+diarized or not), in ~/.scriptotic/config.json. With --model auto and a
+deadline, the largest model whose predicted time for the audio fits is
+chosen. Each prediction is kept next to the time the job actually took and
+every measurement is folded into the estimate, so predictions follow the
+host (and its other load) rather than a fixed table.
+Model sizes never measured on this host start from conservative defaults.
+"""
+
+import time
+import platform
+
+try:
+    from src.core.model_registry import MODEL_SIZES
+    from src.core.autotune import _settings
+except ImportError:
+    from model_registry import MODEL_SIZES
+    from autotune import _settings
+
+SETTING = "model_throughput"
+HISTORY = 20         # predictions kept per model, with the actual times
+SMOOTHING = 0.3      # weight of the newest job in the running estimate
+COLD_LOAD = 1.0      # model_load shorter than this was a warm worker, not a load
+
+# Unmeasured models: audio seconds per wall second, without diarization
+DEFAULT_RTF = {
+    "cuda": {"tiny": 60.0, "base": 45.0, "small": 25.0, "medium": 12.0, "large": 7.0},
+    "cpu": {"tiny": 8.0, "base": 4.0, "small": 1.5, "medium": 0.6, "large": 0.3},
+}
+DEFAULT_LOAD_SECONDS = {"tiny": 3.0, "base": 4.0, "small": 8.0, "medium": 20.0, "large": 40.0}
+DIARIZE_COST = 1.5   # unmeasured models: diarizing makes a job about this much slower
+
+
+class ModelSelector:
+    """Per-host model speed estimates, and the model choice they imply for a deadline"""
+
+    def __init__(self, settings=None):
+        self.settings = settings or _settings()
+        self.host = platform.node()
+
+    def _entries(self):
+        return self.settings.get_setting(SETTING, {}) or {}
+
+    def _key(self, model_size, device, diarize):
+        return f"{self.host}|{model_size}|{device}|{'diarize' if diarize else 'plain'}"
+
+    def device(self):
+        """Device this host's last measured job ran on; "cpu" (the slower guess) if none"""
+        mine = [entry for key, entry in self._entries().items() if key.startswith(self.host + "|")]
+        if not mine:
+            return "cpu"
+        return max(mine, key=lambda entry: entry.get("seen", 0))["device"]
+
+    def estimate(self, model_size, audio_seconds, device=None, diarize=False):
+        """Predicted wall seconds for a job on audio_seconds of audio (model load included)"""
+        device = device or self.device()
+        entry = self._entries().get(self._key(model_size, device, diarize))
+        if entry:
+            rtf, load = entry["rtf"], entry["load_s"]
+        else:
+            rtf = DEFAULT_RTF.get(device, DEFAULT_RTF["cpu"])[model_size] / (DIARIZE_COST if diarize else 1.0)
+            load = DEFAULT_LOAD_SECONDS[model_size]
+        return load + audio_seconds / rtf
+
+    def choose(self, audio_seconds, deadline, diarize=False, device=None):
+        """
+        (model size, predicted seconds) of the largest model predicted to
+        finish within deadline seconds; the fastest model if none does.
+        """
+        device = device or self.device()
+        choice = None
+        for model_size in MODEL_SIZES:
+            predicted = self.estimate(model_size, audio_seconds, device, diarize)
+            if choice is None or predicted <= deadline:
+                choice = (model_size, predicted)
+        return choice
+
+    def record(self, model_size, device, diarize, audio_seconds, work_seconds, load_seconds=0.0,
+               predicted=None, actual_seconds=None):
+        """
+        Fold one finished job into its model's estimate: work_seconds of
+        processing for audio_seconds of audio, after load_seconds of model
+        loading. An auto run also keeps its prediction next to the time the
+        job actually took (actual_seconds, as the caller saw it).
+        """
+        if not audio_seconds or work_seconds <= 0 or model_size not in MODEL_SIZES:
+            return
+        key = self._key(model_size, device, diarize)
+
+        def update(entries):
+            entries = dict(entries or {})
+            entry = entries.get(key) or {}
+            # Average seconds per audio second, not the rate, so the estimate stays a mean time
+            cost = work_seconds / audio_seconds
+            if "rtf" in entry:
+                cost = (1 - SMOOTHING) * (1.0 / entry["rtf"]) + SMOOTHING * cost
+            load = entry.get("load_s", DEFAULT_LOAD_SECONDS[model_size])
+            if load_seconds >= COLD_LOAD:
+                load = (1 - SMOOTHING) * load + SMOOTHING * load_seconds if "load_s" in entry else load_seconds
+            history = entry.get("history", [])
+            if predicted is not None:
+                history = (history + [{"audio_s": round(audio_seconds, 1), "predicted_s": round(predicted, 1),
+                                       "actual_s": round(actual_seconds or work_seconds + load_seconds, 1),
+                                       "date": time.strftime("%Y-%m-%d")}])[-HISTORY:]
+            entries[key] = {"device": device, "rtf": round(1.0 / cost, 4), "load_s": round(load, 2),
+                            "runs": entry.get("runs", 0) + 1, "seen": time.time(), "history": history}
+            return entries
+
+        try:
+            self.settings.update_setting(SETTING, update)
+        except Exception as e:
+            # Losing one measurement must not lose the transcript that was just made
+            print(f"Warning: could not update model speed estimates: {e}")
+
+    def record_job(self, result, wall_seconds=None, audio_seconds=None, diarize=False, predicted=None):
+        """
+        record() from a worker result, timed by the worker's own stage
+        metrics: the stages that depend on the model (align and diarize run
+        side by side, so only the longer counts) plus the model load, in this
+        job or in the preload that came before it. Waiting, IPC and a
+        progressive draft pass are not the model's speed. Jobs served from
+        the result cache say nothing about speed and are skipped.
+        wall_seconds is what the caller measured, kept with auto predictions.
+        """
+        metrics = result.get("metrics") or {}
+        stages = metrics.get("stages", {})
+        if not stages.get("transcribe") or stages["transcribe"].get("cached"):
+            return
+
+        def wall(name, source=stages):
+            return (source.get(name) or {}).get("wall_s", 0.0)
+
+        work = (wall("decode") + wall("vad") + wall("transcribe") + max(wall("align"), wall("diarize"))
+                + wall("merge") + wall("post_process"))
+        load = wall("model_load") + wall("model_load", (result.get("load_metrics") or {}).get("stages", {}))
+        self.record(result.get("model"), result.get("device") or "cpu", diarize,
+                    metrics.get("audio_seconds") or audio_seconds, work, load, predicted, wall_seconds)
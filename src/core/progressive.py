@@ -0,0 +1,56 @@
+"""
+Progressive (two-pass) transcription.
+A small draft model (tiny or base) transcribes the audio first, in short
+windows, so there is something to read within seconds. The selected model
+then re-transcribes it window by window; each refined window replaces the
+draft text it covers, until the final aligned and diarized transcript
+replaces everything.
+The engine publishes the passes as "draft" and "segments" events; DraftView
+is the consumer side that merges them into what should be shown right now.
+"""
+
+try:
+    from src.core.model_registry import MODEL_SIZES
+except ImportError:
+    from model_registry import MODEL_SIZES
+
+DRAFT_MODELS = ("tiny", "base")
+DRAFT_WINDOW_SECONDS = 60    # short draft windows keep the time to the first text low
+REFINE_WINDOW_SECONDS = 120  # refine window length, so replacements arrive steadily
+
+
+def use_draft(model_size, draft_model):
+    """True if a draft pass with draft_model is worth running before model_size"""
+    if not draft_model or draft_model not in MODEL_SIZES or model_size not in MODEL_SIZES:
+        return False
+    return MODEL_SIZES.index(draft_model) < MODEL_SIZES.index(model_size)
+
+
+class DraftView:
+    """The best transcript so far from a job's "draft" and "segments" events"""
+
+    def __init__(self):
+        self.draft = []
+        self.refined = []
+
+    def apply(self, message):
+        """Take in one worker event; returns True if the merged segments changed"""
+        if message.get("event") == "draft":
+            self.draft.extend(message["segments"])
+        elif message.get("event") == "segments":
+            self.refined.extend(message["segments"])
+        else:
+            return False
+        return True
+
+    def refined_until(self):
+        """End time (seconds) up to which the draft has been replaced"""
+        return self.refined[-1]["end"] if self.refined else 0.0
+
+    def segments(self):
+        """Refined segments, followed by the draft segments they don't cover yet"""
+        until = self.refined_until()
+        return self.refined + [seg for seg in self.draft if (seg["start"] + seg["end"]) / 2 >= until]
+
+    def text(self):
+        return ''.join(seg["text"] for seg in self.segments())
@@ -0,0 +1,136 @@
+"""
+Stage-level result store under ~/.scriptotic/results.
+Each pipeline stage (raw Whisper segments, aligned words, diarization turns,
+merged transcript) is saved separately, keyed by the audio's SHA-256 plus
+the parameters that stage depends on. Re-running with another output format
+or different speaker names then reuses everything that didn't change.
+Downloaded sources are also linked to the hash of their audio, so a URL
+can be re-rendered after its audio has left the audio cache.
+"""
+
+import json
+import time
+import shutil
+import hashlib
+from pathlib import Path
+
+try:
+    from src.core.audio_cache import video_id_from_url
+    from src.core.file_lock import write_json_atomic
+except ImportError:
+    from audio_cache import video_id_from_url
+    from file_lock import write_json_atomic
+
+DEFAULT_MAX_MB = 512
+
+
+class ResultStore:
+    """JSON files at <root>/<digest[:2]>/<digest>/<stage>-<params hash>.json"""
+
+    def __init__(self, root=None, max_mb=DEFAULT_MAX_MB):
+        self.root = Path(root) if root else Path.home() / ".scriptotic" / "results"
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def params_key(params):
+        """Stable short hash of a stage's parameters"""
+        encoded = json.dumps(params, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        return hashlib.sha1(encoded).hexdigest()[:16]
+
+    def _audio_dir(self, digest):
+        return self.root / digest[:2] / digest
+
+    def _path(self, digest, stage, params):
+        return self._audio_dir(digest) / f"{stage}-{self.params_key(params)}.json"
+
+    @staticmethod
+    def _read(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return None
+
+    def get(self, digest, stage, params):
+        """Return the stored data for this stage, or None"""
+        record = self._read(self._path(digest, stage, params))
+        if record is None or record.get("params") != params:
+            return None
+        return record["data"]
+
+    def put(self, digest, stage, params, data):
+        """
+        Store data for a stage. Atomic, through a writer-unique temp file, so
+        neither a crash nor two jobs writing the same stage leave half a file.
+        """
+        path = self._path(digest, stage, params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {"stage": stage, "params": params, "created": time.time(), "data": data}
+        write_json_atomic(path, record)
+
+    def _source_path(self, source):
+        # Any URL of the same YouTube video maps to the same link
+        key = video_id_from_url(source) or source
+        return self.root / "sources" / (hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + ".json")
+
+    def link_source(self, source, digest, title=None, duration=None):
+        """Remember which audio a URL downloaded to, for render/relabel"""
+        path = self._source_path(source)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(path, {"source": source, "sha256": digest, "title": title, "duration": duration,
+                                 "created": time.time()})
+
+    def source_info(self, source):
+        """{"sha256", "title", "duration"} of the audio last downloaded for a URL, or None"""
+        return self._read(self._source_path(source))
+
+    def delete(self, digest, stage, params):
+        path = self._path(digest, stage, params)
+        if path.exists():
+            path.unlink()
+
+    def find(self, digest, stage, **filters):
+        """
+        Newest stored (params, data) for a stage whose params match every
+        non-None filter, or None. Used by render/relabel to look up a job by
+        audio alone.
+        """
+        best = None
+        audio_dir = self._audio_dir(digest)
+        if not audio_dir.exists():
+            return None
+        for path in audio_dir.glob(f"{stage}-*.json"):
+            record = self._read(path)
+            if record is None:
+                continue
+            params = record.get("params", {})
+            if any(value is not None and params.get(key) != value for key, value in filters.items()):
+                continue
+            if best is None or record["created"] > best["created"]:
+                best = record
+        return (best["params"], best["data"]) if best else None
+
+    def prune(self):
+        """Drop whole audio entries, least recently written first, until under the size limit"""
+        entries = []
+        total = 0
+        for audio_dir in self.root.glob("*/*"):
+            if not audio_dir.is_dir():
+                continue
+            stats = []
+            for f in audio_dir.iterdir():
+                try:
+                    stats.append(f.stat())
+                except OSError:
+                    pass  # another job's temp file, renamed meanwhile
+            size = sum(stat.st_size for stat in stats)
+            mtime = max((stat.st_mtime for stat in stats), default=0)
+            entries.append((mtime, size, audio_dir))
+            total += size
+
+        for mtime, size, audio_dir in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(audio_dir, ignore_errors=True)
+            total -= size
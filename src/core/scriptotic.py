@@ -11,7 +11,7 @@ import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext, filedialog, messagebox
 import argparse
-from datetime import timedelta
+import functools
 import tempfile
 import queue
 from pathlib import Path
@@ -33,18 +33,36 @@ project_root = os.path.dirname(os.path.dirname(script_dir))
 sys.path.insert(0, project_root)
 sys.path.insert(0, script_dir)
 
-# Import WhisperX engine
+# Warm transcription worker client. The front-end never runs inference, so
+# whisperx and torch are only ever imported by the worker process.
 try:
-    from whisperx_engine import WhisperXEngine as TranscriptionEngine
+    from worker_client import TranscriptionWorker
 except ImportError:
-    try:
-        from src.core.whisperx_engine import WhisperXEngine as TranscriptionEngine
-    except ImportError:
-        print(f"Error: Cannot find whisperx_engine.py")
-        print(f"Script directory: {script_dir}")
-        print(f"Project root: {project_root}")
-        print(f"Python path: {sys.path}")
-        sys.exit(1)
+    from src.core.worker_client import TranscriptionWorker
+
+# Downloaded audio cache and stage result store (used by render/relabel)
+try:
+    from audio_cache import AudioCache, DEFAULT_MAX_MB
+    from audio_buffer import file_digest, load_pcm, SAMPLE_RATE
+    from result_store import ResultStore
+    from speakers import apply_speaker_names
+    from transcript import Transcript
+    from metrics import StageMetrics
+    from batch import BatchManifest, expand_source, run_pipeline, MANIFEST_NAME
+    from workspace import JobWorkspace
+    from progressive import DraftView, DRAFT_MODELS
+    from model_selector import ModelSelector
+except ImportError:
+    from src.core.audio_cache import AudioCache, DEFAULT_MAX_MB
+    from src.core.audio_buffer import file_digest, load_pcm, SAMPLE_RATE
+    from src.core.result_store import ResultStore
+    from src.core.speakers import apply_speaker_names
+    from src.core.transcript import Transcript
+    from src.core.metrics import StageMetrics
+    from src.core.batch import BatchManifest, expand_source, run_pipeline, MANIFEST_NAME
+    from src.core.workspace import JobWorkspace
+    from src.core.progressive import DraftView, DRAFT_MODELS
+    from src.core.model_selector import ModelSelector
 
 # Token management
 try:
@@ -58,13 +76,10 @@ except ImportError:
         print(f"Looking in: {os.path.join(project_root, 'config')}")
         sys.exit(1)
 
-# Core imports for WhisperX
-try:
-    import yt_dlp
-    import whisperx
-    import torch
-except ImportError as e:
-    print(f"Missing dependency: {e}")
+# yt-dlp runs as a subprocess; only check that it is installed (importing it is slow)
+import importlib.util
+if importlib.util.find_spec("yt_dlp") is None:
+    print("Missing dependency: No module named 'yt_dlp'")
     print("\nPlease install required packages:")
     print("pip install yt-dlp whisperx torch")
     sys.exit(1)
@@ -73,11 +88,22 @@ except ImportError as e:
 class AudioDownloader:
     """Handles YouTube audio extraction using yt-dlp"""
     
-    def __init__(self, progress_callback=None):
+    def __init__(self, progress_callback=None, cache=None, audio_format='bestaudio'):
         self.progress_callback = progress_callback
+        self.cache = cache
+        self.audio_format = audio_format
         
     def download(self, url, output_path=None):
         """Download audio from YouTube URL using subprocess to avoid hanging"""
+        # Repeat jobs for the same video skip the network entirely
+        if self.cache:
+            hit = self.cache.get(url, self.audio_format)
+            if hit:
+                cached_path, info = hit
+                if self.progress_callback:
+                    self.progress_callback(40, "Using cached audio")
+                return cached_path, info.get('title') or 'Unknown', info.get('duration') or 0
+        
         if not output_path:
             output_path = tempfile.mktemp(suffix='.webm')
             
@@ -90,7 +116,7 @@ class AudioDownloader:
             
             cmd = [
                 sys.executable, '-m', 'yt_dlp',
-                '--format', 'bestaudio',
+                '--format', self.audio_format,
                 '--output', base_path + '.%(ext)s', 
                 '--print-json',
                 '--quiet',
@@ -119,6 +145,8 @@ class AudioDownloader:
             for ext in ['.webm', '.m4a', '.mp4', '.opus']:
                 actual_output = base_path + ext
                 if os.path.exists(actual_output):
+                    if self.cache:
+                        actual_output = self.cache.put(url, self.audio_format, actual_output, title, duration)
                     if self.progress_callback:
                         self.progress_callback(40, "Audio downloaded successfully")
                     return actual_output, title, duration
@@ -139,21 +167,40 @@ class AudioDownloader:
 
 
 
+def make_audio_cache(token_manager):
+    """Audio cache sized from the 'audio_cache_max_mb' setting in ~/.scriptotic/config.json"""
+    return AudioCache(max_mb=token_manager.get_setting("audio_cache_max_mb", DEFAULT_MAX_MB))
+
+
 class OutputFormatter:
-    """Formats transcription output in various formats"""
+    """
+    Formats transcription output in various formats.
+    The iter_* methods are generators yielding the output in chunks, one
+    segment (or speaker turn) at a time, so write() can stream a long
+    transcript straight to a file without building it in memory first.
+    That lowers peak memory only: every format carries the aligned,
+    diarized segments, which exist once the whole job is done, so files are
+    written after the worker returns. Segments seen while the job runs go to
+    stdout with --stream (draft JSON lines).
+    """
     
     @staticmethod
-    def to_text(segments, title=None, model=None, diarization_method=None):
-        """Convert to readable text format"""
-        output = []
+    def iter_text(segments, title=None, model=None, diarization_method=None):
+        """Readable text format, one speaker turn per chunk"""
+        header = []
         if title:
-            output.append(f"# {title}")
+            header.append(f"# {title}")
         if model:
-            output.append(f"Model: WhisperX {model}")
+            header.append(f"Model: WhisperX {model}")
         if diarization_method and diarization_method != "none":
-            output.append(f"Diarization: {diarization_method}")
+            header.append(f"Diarization: {diarization_method}")
         if title or model or diarization_method:
-            output.append("")  # Add blank line
+            header.append("")  # Add blank line
+        
+        separator = ""
+        for line in header:
+            yield separator + line
+            separator = "\n\n"
             
         current_speaker = None
         current_text = []
@@ -161,63 +208,194 @@ class OutputFormatter:
         for segment in segments:
             if segment['speaker'] != current_speaker:
                 if current_text:
-                    output.append(f"[{current_speaker}] {' '.join(current_text)}")
+                    yield f"{separator}[{current_speaker}] {' '.join(current_text)}"
+                    separator = "\n\n"
                 current_speaker = segment['speaker']
                 current_text = [segment['text']]
             else:
                 current_text.append(segment['text'])
                 
         if current_text:
-            output.append(f"[{current_speaker}] {' '.join(current_text)}")
-            
-        return '\n\n'.join(output)
+            yield f"{separator}[{current_speaker}] {' '.join(current_text)}"
     
     @staticmethod
-    def to_json(segments, title=None, duration=None, model=None, diarization_method=None):
-        """Convert to JSON format"""
-        data = {
+    def iter_json(segments, title=None, duration=None, model=None, diarization_method=None):
+        """JSON format (same document json.dumps(indent=2) would give), one segment per chunk"""
+        header = json.dumps({
             'video_title': title or 'Unknown',
             'duration': duration or 0,
             'model': f'WhisperX {model}' if model else 'Unknown',
-            'diarization': diarization_method if diarization_method and diarization_method != "none" else None,
-            'speakers': []
-        }
+            'diarization': diarization_method if diarization_method and diarization_method != "none" else None
+        }, indent=2)
+        yield header[:-2] + ',\n  "speakers": ['
         
+        separator = "\n"
         for segment in segments:
-            data['speakers'].append({
+            entry = json.dumps({
                 'speaker_id': segment['speaker'],
                 'start_time': segment['start'],
                 'end_time': segment['end'],
                 'text': segment['text']
-            })
+            }, indent=2)
+            yield separator + "    " + entry.replace("\n", "\n    ")
+            separator = ",\n"
             
-        return json.dumps(data, indent=2)
+        yield "]\n}" if separator == "\n" else "\n  ]\n}"
     
     @staticmethod
-    def to_srt(segments):
-        """Convert to SRT subtitle format"""
-        output = []
-        
+    def iter_srt(segments):
+        """SRT subtitle format, one cue per chunk"""
+        separator = ""
         for i, segment in enumerate(segments, 1):
             start = OutputFormatter._seconds_to_srt_time(segment['start'])
             end = OutputFormatter._seconds_to_srt_time(segment['end'])
-            text = f"[{segment['speaker']}] {segment['text']}"
-            
-            output.append(f"{i}")
-            output.append(f"{start} --> {end}")
-            output.append(text)
-            output.append("")
-            
-        return '\n'.join(output)
+            yield f"{separator}{i}\n{start} --> {end}\n[{segment['speaker']}] {segment['text']}\n"
+            separator = "\n"
+    
+    @staticmethod
+    def iter_vtt(segments):
+        """WebVTT subtitle format, one cue per chunk (speaker as a voice tag)"""
+        yield "WEBVTT\n"
+        for segment in segments:
+            start = OutputFormatter._seconds_to_srt_time(segment['start'], '.')
+            end = OutputFormatter._seconds_to_srt_time(segment['end'], '.')
+            text = segment['text'].replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            yield f"\n{start} --> {end}\n<v {segment['speaker']}>{text.strip()}\n"
+    
+    @staticmethod
+    def iter_jsonl(segments):
+        """JSON Lines format: one object per segment, same fields as the JSON speakers list"""
+        for segment in segments:
+            yield json.dumps({
+                'speaker_id': segment['speaker'],
+                'start_time': segment['start'],
+                'end_time': segment['end'],
+                'text': segment['text']
+            }) + "\n"
     
     @staticmethod
-    def _seconds_to_srt_time(seconds):
-        """Convert seconds to SRT time format"""
-        td = timedelta(seconds=seconds)
-        hours = int(td.total_seconds() // 3600)
-        minutes = int((td.total_seconds() % 3600) // 60)
-        secs = td.total_seconds() % 60
-        return f"{hours:02d}:{minutes:02d}:{secs:06.3f}".replace('.', ',')
+    def to_text(segments, title=None, model=None, diarization_method=None):
+        """Convert to readable text format"""
+        return ''.join(OutputFormatter.iter_text(segments, title, model, diarization_method))
+    
+    @staticmethod
+    def to_json(segments, title=None, duration=None, model=None, diarization_method=None):
+        """Convert to JSON format"""
+        return ''.join(OutputFormatter.iter_json(segments, title, duration, model, diarization_method))
+    
+    @staticmethod
+    def to_srt(segments):
+        """Convert to SRT subtitle format"""
+        return ''.join(OutputFormatter.iter_srt(segments))
+    
+    @staticmethod
+    def _seconds_to_srt_time(seconds, separator=','):
+        """Convert seconds to SRT time format (integer math, no timedelta)"""
+        millis = int(round(seconds * 1000))
+        hours, millis = divmod(millis, 3600000)
+        minutes, millis = divmod(millis, 60000)
+        secs, millis = divmod(millis, 1000)
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+    
+    @staticmethod
+    def iter_format(format_type, segments, title=None, duration=None, model=None, diarization_method=None):
+        """Chunks of segments rendered in the named format (see FORMATS)"""
+        if format_type == 'json':
+            return OutputFormatter.iter_json(segments, title, duration, model, diarization_method)
+        elif format_type == 'srt':
+            return OutputFormatter.iter_srt(segments)
+        elif format_type == 'vtt':
+            return OutputFormatter.iter_vtt(segments)
+        elif format_type == 'jsonl':
+            return OutputFormatter.iter_jsonl(segments)
+        return OutputFormatter.iter_text(segments, title, model, diarization_method)
+    
+    @staticmethod
+    def format_as(format_type, segments, title=None, duration=None, model=None, diarization_method=None):
+        """Render segments in the named format (see FORMATS)"""
+        return ''.join(OutputFormatter.iter_format(format_type, segments, title, duration, model,
+                                                   diarization_method))
+    
+    @staticmethod
+    def write(f, format_type, segments, title=None, duration=None, model=None, diarization_method=None):
+        """Stream segments in the named format to an open text file"""
+        for chunk in OutputFormatter.iter_format(format_type, segments, title, duration, model,
+                                                 diarization_method):
+            f.write(chunk)
+    
+    @staticmethod
+    def save(path, format_type, segments, title=None, duration=None, model=None, diarization_method=None):
+        """Stream segments in the named format to a file at path"""
+        with open(path, 'w', encoding='utf-8') as f:
+            OutputFormatter.write(f, format_type, segments, title, duration, model, diarization_method)
+    
+    @staticmethod
+    def save_all(output_paths, segments, title=None, duration=None, model=None, diarization_method=None):
+        """Write one file per format from the same segments ({format: path}, see output_paths)"""
+        for format_type, path in output_paths.items():
+            OutputFormatter.save(path, format_type, segments, title, duration, model, diarization_method)
+
+
+# Output formats and their file extensions
+FORMATS = {'text': '.txt', 'json': '.json', 'srt': '.srt', 'vtt': '.vtt', 'jsonl': '.jsonl'}
+
+
+def parse_formats(value):
+    """argparse type for --format: one format, a comma-separated list, or 'all'"""
+    if value.strip() == 'all':
+        return list(FORMATS)
+    formats = []
+    for name in value.split(','):
+        name = name.strip()
+        if name not in FORMATS:
+            raise argparse.ArgumentTypeError(
+                f"invalid format '{name}' (choose from {', '.join(FORMATS)}, or 'all')")
+        if name not in formats:
+            formats.append(name)
+    return formats
+
+
+def link_source(url, audio_path, title, duration):
+    """Record which audio a URL downloaded to, so render/relabel work after the audio cache evicts it"""
+    ResultStore().link_source(url, file_digest(audio_path), title, duration)
+
+
+def parse_batch_size(value):
+    """argparse type for --batch-size: a positive number or 'auto'"""
+    if value == 'auto':
+        return value
+    try:
+        size = int(value)
+    except ValueError:
+        size = 0
+    if size < 1:
+        raise argparse.ArgumentTypeError("expected a positive number or 'auto'")
+    return size
+
+
+def parse_deadline(value):
+    """argparse type for --deadline: seconds, or a time such as 90s, 15m or 1h"""
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    text = value.strip().lower()
+    try:
+        seconds = float(text[:-1]) * units[text[-1]] if text[-1:] in units else float(text)
+    except ValueError:
+        seconds = 0
+    if seconds <= 0:
+        raise argparse.ArgumentTypeError("expected a positive number of seconds, or e.g. 90s, 15m, 1h")
+    return seconds
+
+
+def output_paths(output, formats, default_base='transcript'):
+    """
+    Map each format to the file it is written to. A single format uses
+    output as given (None = print to stdout); several formats share output's
+    base name with each format's extension.
+    """
+    if len(formats) == 1:
+        return {formats[0]: output}
+    base = os.path.splitext(output)[0] if output else default_base
+    return {format_type: base + FORMATS[format_type] for format_type in formats}
 
 
 class TranscriptGUI:
@@ -235,14 +413,20 @@ class TranscriptGUI:
         # Variables with default values for testing
         self.url_var = tk.StringVar(value="https://www.youtube.com/watch?v=htOvH12T7mU")
         self.speakers_var = tk.StringVar(value="Scott, Dwarkesh, Daniel")
-        self.format_var = tk.StringVar(value='text')
+        self.format_vars = {name: tk.BooleanVar(value=(name == 'text')) for name in FORMATS}
         self.model_var = tk.StringVar(value='large')
+        self.vad_var = tk.BooleanVar(value=False)
+        self.draft_var = tk.BooleanVar(value=True)
         self.output_path_var = tk.StringVar(value='transcript.txt')
         
         # Progress tracking
         self.progress_queue = queue.Queue()
         self.processing = False
         
+        # Transcription worker stays warm between jobs (started on first use)
+        self.worker = TranscriptionWorker()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        
         self._setup_ui()
         self._center_window()
         
@@ -268,17 +452,23 @@ class TranscriptGUI:
         
         # Model selection
         ttk.Label(main_frame, text="WhisperX Model:").grid(row=2, column=0, sticky=tk.W, pady=5)
-        model_combo = ttk.Combobox(main_frame, textvariable=self.model_var, 
+        model_frame = ttk.Frame(main_frame)
+        model_frame.grid(row=2, column=1, sticky=tk.W, pady=5)
+        model_combo = ttk.Combobox(model_frame, textvariable=self.model_var, 
                                   values=['tiny', 'base', 'small', 'medium', 'large'], 
                                   state='readonly', width=20)
-        model_combo.grid(row=2, column=1, sticky=tk.W, pady=5)
+        model_combo.pack(side=tk.LEFT)
+        ttk.Checkbutton(model_frame, text="Skip silence & music", variable=self.vad_var).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Checkbutton(model_frame, text="Quick draft first", variable=self.draft_var).pack(side=tk.LEFT, padx=(10, 0))
         ttk.Label(main_frame, text="(larger = better quality, slower)").grid(row=2, column=2, sticky=tk.W, pady=5)
         
         # Output format
         ttk.Label(main_frame, text="Output Format:").grid(row=3, column=0, sticky=tk.W, pady=5)
-        format_combo = ttk.Combobox(main_frame, textvariable=self.format_var, 
-                                   values=['text', 'json', 'srt'], state='readonly', width=20)
-        format_combo.grid(row=3, column=1, sticky=tk.W, pady=5)
+        format_frame = ttk.Frame(main_frame)
+        format_frame.grid(row=3, column=1, sticky=tk.W, pady=5)
+        for name, var in self.format_vars.items():
+            ttk.Checkbutton(format_frame, text=name, variable=var).pack(side=tk.LEFT, padx=(0, 8))
+        ttk.Label(main_frame, text="(one file per format)").grid(row=3, column=2, sticky=tk.W, pady=5)
         
         # Output path
         ttk.Label(main_frame, text="Save Location:").grid(row=4, column=0, sticky=tk.W, pady=5)
@@ -334,6 +524,8 @@ class TranscriptGUI:
                 ('Text files', '*.txt'),
                 ('JSON files', '*.json'),
                 ('SRT files', '*.srt'),
+                ('WebVTT files', '*.vtt'),
+                ('JSON Lines files', '*.jsonl'),
                 ('All files', '*.*')
             ]
         )
@@ -367,7 +559,7 @@ class TranscriptGUI:
         
     def _process_video(self, url):
         """Process video in background thread"""
-        temp_audio = None
+        workspace = None
         
         try:
             # Ensure HuggingFace token is configured
@@ -379,107 +571,76 @@ class TranscriptGUI:
             if self.speakers_var.get().strip():
                 speaker_names = [s.strip() for s in self.speakers_var.get().split(',')]
             
-            # Download audio
-            downloader = AudioDownloader(progress_callback=self._update_progress)
-            temp_audio, title, duration = downloader.download(url)
+            # Load models in the worker while the audio downloads
+            self.worker.preload(self.model_var.get(), token_manager.get_token(),
+                                diarize=bool(speaker_names))
             
-            # Copy temp file to current directory to avoid Windows temp path issues
-            import shutil
-            local_audio = "downloaded_audio.webm"
-            shutil.copy2(temp_audio, local_audio)
-            temp_audio = local_audio
+            # Download audio
+            metrics = StageMetrics()
+            downloader = AudioDownloader(progress_callback=self._update_progress,
+                                         cache=make_audio_cache(token_manager))
+            # Each job gets its own directory, so concurrent jobs never share a file
+            workspace = JobWorkspace()
+            with metrics.stage("download"):
+                temp_audio, title, duration = downloader.download(url, output_path=workspace.file("download.webm"))
+            temp_audio = workspace.adopt(temp_audio)
+            link_source(url, temp_audio, title, duration)
             
-            # Use subprocess isolation to avoid process state pollution (like CLI)
+            # Transcribe in the isolated worker process (kept warm between jobs)
             self._update_progress(60, "Starting transcription...")
             
-            import subprocess
-            import json
-            
             model_size = self.model_var.get()
-            # Get the project root directory (two levels up from src/core/)
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            worker_path = os.path.join(project_root, 'src', 'workers', 'transcribe_worker.py')
+            if not self.worker.is_alive():
+                self._update_progress(65, "Starting transcription worker...")
+            self._update_progress(70, f"Transcribing with {model_size} model...")
+            draft_view = DraftView()
+            def on_event(message):
+                if message["event"] == "progress":
+                    # Worker percentages run 10-90; map them onto the rest of the bar
+                    self._update_progress(70 + message["percent"] * 25 // 100, message["message"])
+                elif draft_view.apply(message):
+                    # Show draft text as it is transcribed (refined windows replace the quick
+                    # draft's); the final transcript replaces it all
+                    self.progress_queue.put(('partial', draft_view.text()))
             
-            cmd = [
-                sys.executable, worker_path,
-                temp_audio,
-                '--model', model_size,
-                '--hf-token', token_manager.get_token() or ""
-            ]
-            
-            if speaker_names:
-                cmd.extend(['--speakers', ','.join(speaker_names)])
-            
-            # Debug: Print command and working directory
-            self._update_progress(70, f"Running command: {' '.join(cmd[:3])}...")
-            
-            # Run from project root directory to match command line behavior
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800, cwd=project_root)
-            
-            if result.returncode != 0:
-                # Include both stdout and stderr in error message for better debugging
-                error_msg = f"Transcription subprocess failed (exit code {result.returncode}):\n"
-                if result.stderr:
-                    error_msg += f"STDERR:\n{result.stderr}\n"
-                if result.stdout:
-                    error_msg += f"STDOUT:\n{result.stdout}\n"
-                raise Exception(error_msg)
-            
-            # Parse JSON result from subprocess output
-            lines = result.stdout.strip().split('\n')
-            json_line = None
-            for line in lines:
-                if line.startswith('{') and line.endswith('}'):
-                    json_line = line
-                    break
-            
-            if not json_line:
-                raise Exception("No JSON output found in subprocess result")
-                
-            transcription_result = json.loads(json_line)
-            
-            if not transcription_result.get("success"):
-                raise Exception(f"Transcription failed: {transcription_result.get('error', 'Unknown error')}")
+            transcription_result = self.worker.transcribe(
+                temp_audio, model_size,
+                speaker_names=speaker_names,
+                hf_token=token_manager.get_token(),
+                on_event=on_event,
+                vad=self.vad_var.get(),
+                draft_model='tiny' if self.draft_var.get() else None
+            )
+            # Every run refines this machine's speed estimates for --model auto
+            ModelSelector(token_manager).record_job(transcription_result, audio_seconds=duration,
+                                                    diarize=bool(speaker_names))
             
             segments = transcription_result["segments"]
             model_used = transcription_result["model"]
             diarization_method = transcription_result.get("diarization_method", "unknown")
             
-            # Format output
-            format_type = self.format_var.get()
-            if format_type == 'json':
-                output = OutputFormatter.to_json(segments, title, duration, model_used, diarization_method)
-            elif format_type == 'srt':
-                output = OutputFormatter.to_srt(segments)
-            else:
-                output = OutputFormatter.to_text(segments, title, model_used, diarization_method)
-            
-            # Save to file
-            output_path = self.output_path_var.get()
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(output)
+            # Stream every selected format to file, then show the first one saved
+            formats = [name for name, var in self.format_vars.items() if var.get()] or ['text']
+            paths = output_paths(self.output_path_var.get(), formats)
+            with metrics.stage("format"):
+                OutputFormatter.save_all(paths, segments, title, duration, model_used, diarization_method)
+            metrics.merge(transcription_result.get("metrics"))
+            metrics.audio_seconds = metrics.audio_seconds or duration or None
+            metrics.log()
+            with open(paths[formats[0]], 'r', encoding='utf-8') as f:
+                output = f.read()
             
             # Update GUI
             self.progress_queue.put(('done', output))
-            self._update_progress(100, f"Completed using {model_used} model - Saved to {output_path}")
+            self._update_progress(100, f"Completed using {model_used} model - Saved to {', '.join(paths.values())}")
             
         except Exception as e:
             self.progress_queue.put(('error', str(e)))
             
         finally:
             # Cleanup
-            if temp_audio and os.path.exists(temp_audio):
-                try:
-                    os.remove(temp_audio)
-                except:
-                    pass
-            
-            # Also cleanup the copied local file
-            if os.path.exists("downloaded_audio.webm"):
-                try:
-                    os.remove("downloaded_audio.webm")
-                except:
-                    pass
+            if workspace:
+                workspace.close()
                     
             self.processing = False
             
@@ -498,7 +659,13 @@ class TranscriptGUI:
                     self.progress_var.set(percent)
                     self.status_label.config(text=message)
                     
+                elif msg_type == 'partial':
+                    self.result_text.delete(1.0, tk.END)
+                    self.result_text.insert(1.0, data)
+                    self.result_text.see(tk.END)
+                    
                 elif msg_type == 'done':
+                    self.result_text.delete(1.0, tk.END)
                     self.result_text.insert(1.0, data)
                     self.generate_btn.config(state='normal')
                     self.status_label.config(text="Transcript generated successfully!")
@@ -518,23 +685,85 @@ class TranscriptGUI:
         if self.processing or not self.progress_queue.empty():
             self.root.after(100, self._check_progress)
             
+    def _on_close(self):
+        """Shut down the worker process along with the window"""
+        if self.processing:
+            self.worker.kill()
+        else:
+            self.worker.stop()
+        self.root.destroy()
+            
     def run(self):
         """Run the GUI"""
         self.root.mainloop()
 
 
+def _emit(formats, output, segments, title, duration, model, diarization_method, banner=False, log=print):
+    """Save every requested format, or print a single format when there is no output path"""
+    paths = output_paths(output, formats)
+    if len(paths) == 1 and not output:
+        if banner:
+            print("\n" + "="*50 + "\n")
+        OutputFormatter.write(sys.stdout, formats[0], segments, title, duration, model, diarization_method)
+        if formats[0] in ('text', 'json'):  # the other formats already end with a newline
+            print()
+        return
+    OutputFormatter.save_all(paths, segments, title, duration, model, diarization_method)
+    for path in paths.values():
+        log(f"Transcript saved to {path}")
+
+
 def cli_main():
     """Command-line interface"""
-    parser = argparse.ArgumentParser(description='YouTube URL to Transcript Tool')
+    parser = argparse.ArgumentParser(
+        description='YouTube URL to Transcript Tool',
+        epilog="Other commands: 'batch SOURCE' transcribes a URL list, playlist or folder; "
+               "'render'/'relabel URL' rebuild a previous transcript (each has its own --help). "
+               "Run without arguments for the GUI."
+    )
     parser.add_argument('url', help='YouTube video URL')
     parser.add_argument('--names', help='Comma-separated speaker names')
-    parser.add_argument('--format', choices=['text', 'json', 'srt'], default='text',
-                      help='Output format')
+    parser.add_argument('--format', type=parse_formats, default=['text'],
+                      help=f"Output format(s): {', '.join(FORMATS)}; comma-separated list or 'all' "
+                           "(several formats are written next to --output, one file each)")
     parser.add_argument('--output', help='Output file path')
-    parser.add_argument('--model', choices=['tiny', 'base', 'small', 'medium', 'large'],
-                      default='base', help='Whisper model size')
+    parser.add_argument('--model', choices=['tiny', 'base', 'small', 'medium', 'large', 'auto'],
+                      default='base', help="Whisper model size; 'auto' picks the largest one predicted to "
+                                           "finish within --deadline on this machine")
+    parser.add_argument('--deadline', type=parse_deadline,
+                      help='With --model auto: time the whole job may take, in seconds or e.g. 15m, 1h')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Always download, bypassing the ~/.scriptotic audio cache')
+    parser.add_argument('--shards', type=int, default=1,
+                      help='CPU only: split long audio across this many transcription processes')
+    parser.add_argument('--batch-size', type=parse_batch_size,
+                      help="ASR batch size, or 'auto' to measure the best one for this machine and model "
+                           "(remembered in ~/.scriptotic; default: the remembered size, else a safe small one)")
+    parser.add_argument('--compute-type', choices=['auto', 'int8', 'int8_float32', 'float32'],
+                      help="CPU precision; 'auto' measures which is fastest on this machine once and "
+                           "remembers it (default: the remembered one, else int8)")
+    parser.add_argument('--jobs', type=int,
+                      help='How many jobs share this machine\'s CPU cores (default: count running jobs)')
+    parser.add_argument('--vad', action='store_true',
+                      help='Skip silence and music: only detected speech is transcribed and diarized')
+    parser.add_argument('--progressive', nargs='?', const='tiny', choices=DRAFT_MODELS, metavar='DRAFT_MODEL',
+                      help="Draft the transcript with a small model first (tiny, or 'base'), then refine it "
+                           "with --model window by window")
+    parser.add_argument('--stream', action='store_true',
+                      help='Write segments to stdout as JSON lines while transcribing (drafts marked '
+                           '"partial"; with --progressive the quick draft is also marked "draft" and is '
+                           'superseded by later partial lines up to their end_time), then the final '
+                           'segments; status messages go to stderr')
     
     args = parser.parse_args()
+    if args.model == 'auto' and not args.deadline:
+        parser.error("--model auto needs a --deadline")
+    if args.deadline and args.model != 'auto':
+        parser.error("--deadline only applies to --model auto")
+    started = time.time()
+    
+    # With --stream stdout carries only JSON lines, so it can be piped downstream
+    log = functools.partial(print, file=sys.stderr) if args.stream else print
     
     # Ensure HuggingFace token is configured
     token_manager = TokenManager()
@@ -545,106 +774,313 @@ def cli_main():
     if args.names:
         speaker_names = [s.strip() for s in args.names.split(',')]
     
-    print("Downloading audio...")
-    downloader = AudioDownloader()
-    temp_audio, title, duration = downloader.download(args.url)
-    print(f"Audio downloaded: {temp_audio}")
-    
-    # Copy temp file to current directory to avoid Windows temp path issues
-    import shutil
-    local_audio = "downloaded_audio.webm"
-    shutil.copy2(temp_audio, local_audio)
-    print(f"Audio copied to: {local_audio}")
-    temp_audio = local_audio
+    # Transcription runs in an isolated worker process to avoid process state pollution.
+    # It starts loading models now so that happens while the audio downloads.
+    log(f"HF Token available: {bool(token_manager.get_token())}")
+    worker = TranscriptionWorker(worker_args=['--jobs', str(args.jobs)] if args.jobs else None)
+    selector = ModelSelector(token_manager)
+    if args.model == 'auto':
+        log("The model will be chosen once the audio length is known...")
+    else:
+        log(f"Initializing WhisperX {args.model} model...")
+        worker.preload(args.model, token_manager.get_token(), diarize=bool(speaker_names),
+                       compute_type=args.compute_type)
     
-    print("DEBUG: About to enter try block...")
+    workspace = None
     try:
-        print("DEBUG: Inside try block...")
-        print(f"Initializing WhisperX {args.model} model...")
-        print(f"HF Token available: {bool(token_manager.get_token())}")
-        print("DEBUG: Using subprocess isolation to avoid process state pollution...")
-        
-        # Use subprocess to run transcription in clean environment (Gemini's recommendation)
-        import subprocess
-        import json
-        
-        # Get the project root directory (two levels up from src/core/)
-        project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        worker_path = os.path.join(project_root, 'src', 'workers', 'transcribe_worker.py')
-        
-        cmd = [
-            sys.executable, worker_path,
-            temp_audio,
-            '--model', args.model,
-            '--hf-token', token_manager.get_token() or ""
-        ]
-        
-        if speaker_names:
-            cmd.extend(['--speakers', ','.join(speaker_names)])
-        
-        print(f"Running isolated transcription: {' '.join(cmd[:3])}...")
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=1800, cwd=project_root)  # 30 min timeout
-        
-        if result.returncode != 0:
-            # Include both stdout and stderr in error message for better debugging
-            error_msg = f"Transcription subprocess failed (exit code {result.returncode}):\n"
-            if result.stderr:
-                error_msg += f"STDERR:\n{result.stderr}\n"
-            if result.stdout:
-                error_msg += f"STDOUT:\n{result.stdout}\n"
-            raise Exception(error_msg)
-        
-        # Parse JSON result from subprocess output (JSON is at the end)
-        try:
-            # Find the JSON line (starts with '{' and ends with '}')
-            lines = result.stdout.strip().split('\n')
-            json_line = None
-            for line in lines:
-                if line.startswith('{') and line.endswith('}'):
-                    json_line = line
-                    break
-            
-            if not json_line:
-                raise Exception("No JSON output found in subprocess result")
-                
-            transcription_result = json.loads(json_line)
-        except json.JSONDecodeError as e:
-            raise Exception(f"Failed to parse transcription result: {e}\nOutput: {result.stdout}")
+        # Each job gets its own directory, so concurrent jobs never share a file
+        workspace = JobWorkspace()
+        log("Downloading audio...")
+        metrics = StageMetrics()
+        downloader = AudioDownloader(cache=None if args.no_cache else make_audio_cache(token_manager))
+        with metrics.stage("download"):
+            temp_audio, title, duration = downloader.download(args.url, output_path=workspace.file("download.webm"))
+        # Cached audio is hardlinked in, so eviction by another job can't pull it away mid-run
+        temp_audio = workspace.adopt(temp_audio)
+        link_source(args.url, temp_audio, title, duration)
+        log(f"Audio downloaded: {temp_audio}")
         
-        if not transcription_result.get("success"):
-            raise Exception(f"Transcription failed: {transcription_result.get('error', 'Unknown error')}")
+        model_size, predicted, pcm_dir = args.model, None, None
+        if args.model == 'auto':
+            if not duration:
+                # No length from yt-dlp: decode now (the worker reuses the decoded PCM)
+                pcm_dir = workspace.file("pcm")
+                duration = len(load_pcm(temp_audio, cache_dir=pcm_dir)) / SAMPLE_RATE
+            remaining = args.deadline - (time.time() - started)
+            model_size, predicted = selector.choose(duration, remaining, diarize=bool(speaker_names))
+            log(f"Auto model: {model_size} (predicted {predicted:.0f}s for {duration:.0f}s of audio, "
+                f"{remaining:.0f}s left before the deadline)")
+            if predicted > remaining:
+                log("Warning: even the fastest model is predicted to miss the deadline")
+        
+        log("Running isolated transcription worker...")
+        def on_event(message):
+            if message["event"] == "progress":
+                log(f"  {message['message']}")
+            elif message["event"] in ("segments", "draft") and args.stream:
+                for segment in message["segments"]:
+                    # Drafts are not diarized yet, so they carry no speaker
+                    line = {'speaker_id': None, 'start_time': segment['start'],
+                            'end_time': segment['end'], 'text': segment['text'], 'partial': True}
+                    if message["event"] == "draft":
+                        line['draft'] = True
+                    print(json.dumps(line), flush=True)
+        
+        transcribe_started = time.time()
+        transcription_result = worker.transcribe(
+            temp_audio, model_size,
+            speaker_names=speaker_names,
+            hf_token=token_manager.get_token(),
+            pcm_cache_dir=pcm_dir,
+            shards=args.shards,
+            on_event=on_event,
+            batch_size=args.batch_size,
+            compute_type=args.compute_type,
+            vad=args.vad,
+            draft_model=args.progressive
+        )
+        transcribe_seconds = time.time() - transcribe_started
+        # Every run refines this machine's speed estimates; auto runs also keep their prediction
+        selector.record_job(transcription_result, transcribe_seconds, duration,
+                            diarize=bool(speaker_names), predicted=predicted)
+        if predicted is not None:
+            log(f"Predicted {predicted:.0f}s, took {transcribe_seconds:.0f}s")
         
         segments = transcription_result["segments"]
         model_used = transcription_result["model"]
         diarization_method = transcription_result.get("diarization_method", "unknown")
-        print(f"Transcription completed! Got {len(segments)} segments using {model_used} model")
+        log(f"Transcription completed! Got {len(segments)} segments using {model_used} model")
         
-        print("Formatting output...")
-        if args.format == 'json':
-            output = OutputFormatter.to_json(segments, title, duration, model_used, diarization_method)
-        elif args.format == 'srt':
-            output = OutputFormatter.to_srt(segments)
-        else:
-            output = OutputFormatter.to_text(segments, title, model_used, diarization_method)
+        log("Formatting output...")
         
-        # Save or print
-        if args.output:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                f.write(output)
-            print(f"Transcript saved to {args.output}")
-        else:
-            print("\n" + "="*50 + "\n")
-            print(output)
+        # Save or print (streamed - the formatted transcript is never held in memory whole)
+        with metrics.stage("format"):
+            if args.stream and not args.output:
+                OutputFormatter.write(sys.stdout, 'jsonl', segments)
+            else:
+                _emit(args.format, args.output, segments, title, duration, model_used, diarization_method,
+                      banner=not args.stream, log=log)
+        
+        # Per-stage timings go to stderr so they never mix with a transcript on stdout
+        metrics.merge(transcription_result.get("metrics"))
+        metrics.audio_seconds = metrics.audio_seconds or duration or None
+        metrics.log()
             
     finally:
         # Cleanup
-        if os.path.exists(temp_audio):
-            os.remove(temp_audio)
+        worker.stop()
+        if workspace:
+            workspace.close()
+
+
+def render_main():
+    """Rebuild a previous transcript from cached results - no download or transcription"""
+    parser = argparse.ArgumentParser(
+        prog='scriptotic render',
+        description='Re-render or relabel a previous transcript from cached results'
+    )
+    parser.add_argument('command', choices=['render', 'relabel'])
+    parser.add_argument('source', help='YouTube URL or local audio file that was transcribed before')
+    parser.add_argument('--names', help='Comma-separated speaker names (default: names from the original run)')
+    parser.add_argument('--format', type=parse_formats, default=['text'],
+                      help=f"Output format(s): {', '.join(FORMATS)}; comma-separated list or 'all'")
+    parser.add_argument('--output', help='Output file path')
+    parser.add_argument('--model', choices=['tiny', 'base', 'small', 'medium', 'large'],
+                      help='Use the run made with this model (default: most recent run)')
+    
+    args = parser.parse_args()
+    
+    # Find the audio hash the worker cached results under
+    if os.path.isfile(args.source):
+        digest = file_digest(args.source)
+        title = os.path.basename(args.source)
+        duration = 0
+    else:
+        # The link is written at download time; the audio cache covers runs made before links existed
+        info = ResultStore().source_info(args.source)
+        if info is None:
+            hit = make_audio_cache(TokenManager()).get(args.source, 'bestaudio')
+            info = hit[1] if hit else None
+        if not info:
+            raise Exception(f"No previous run found for {args.source} - transcribe it first")
+        digest = info["sha256"]
+        title = info.get("title") or 'Unknown'
+        duration = info.get("duration") or 0
+    
+    found = ResultStore().find(digest, "final", model=args.model)
+    if not found:
+        raise Exception(f"No cached transcript for {args.source} - transcribe it first")
+    _, record = found
+    
+    speaker_names = record.get("speaker_names")
+    if args.names:
+        speaker_names = [s.strip() for s in args.names.split(',')]
+    if "transcript" in record:
+        segments = apply_speaker_names(Transcript.from_dict(record["transcript"]), speaker_names)
+    else:
+        # Results cached before transcripts were stored as arrays
+        segments = apply_speaker_names(record["segments"], speaker_names)
+    
+    _emit(args.format, args.output, segments, title, duration,
+          record["model"], record.get("diarization_method"))
+
+
+def batch_main():
+    """Transcribe a list of videos or files with one warm worker, downloading ahead while transcribing"""
+    parser = argparse.ArgumentParser(
+        prog='scriptotic batch',
+        description='Transcribe many videos or audio files; re-run the same command to resume'
+    )
+    parser.add_argument('command', choices=['batch'])
+    parser.add_argument('source', help='Text file of URLs (one per line), playlist or channel URL, '
+                                       'or directory of audio files')
+    parser.add_argument('--output-dir', default='transcripts', help='Directory for transcripts (default: transcripts)')
+    parser.add_argument('--names', help='Comma-separated speaker names (used for every item)')
+    parser.add_argument('--format', type=parse_formats, default=['text'],
+                      help=f"Output format(s): {', '.join(FORMATS)}; comma-separated list or 'all'")
+    parser.add_argument('--model', choices=['tiny', 'base', 'small', 'medium', 'large', 'auto'],
+                      default='base', help="Whisper model size; 'auto' picks one per item to fit --deadline")
+    parser.add_argument('--deadline', type=parse_deadline,
+                      help='With --model auto: time each item\'s transcription may take, in seconds or e.g. 15m')
+    parser.add_argument('--no-cache', action='store_true',
+                      help='Always download, bypassing the ~/.scriptotic audio cache')
+    parser.add_argument('--shards', type=int, default=1,
+                      help='CPU only: split long audio across this many transcription processes')
+    parser.add_argument('--batch-size', type=parse_batch_size,
+                      help="ASR batch size, or 'auto' to tune it on the first item")
+    parser.add_argument('--compute-type', choices=['auto', 'int8', 'int8_float32', 'float32'],
+                      help="CPU precision; 'auto' measures the fastest on the first item")
+    parser.add_argument('--jobs', type=int,
+                      help='How many jobs share this machine\'s CPU cores (default: count running jobs)')
+    parser.add_argument('--vad', action='store_true',
+                      help='Skip silence and music: only detected speech is transcribed and diarized')
+    parser.add_argument('--manifest', help=f'Batch status file (default: <output-dir>/{MANIFEST_NAME})')
+    
+    args = parser.parse_args()
+    if args.model == 'auto' and not args.deadline:
+        parser.error("--model auto needs a --deadline")
+    if args.deadline and args.model != 'auto':
+        parser.error("--deadline only applies to --model auto")
+    
+    token_manager = TokenManager()
+    token_manager.ensure_token()
+    speaker_names = [s.strip() for s in args.names.split(',')] if args.names else None
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    pcm_dir = os.path.join(args.output_dir, '.pcm')
+    manifest = BatchManifest(args.manifest or os.path.join(args.output_dir, MANIFEST_NAME))
+    
+    print(f"Listing {args.source}...")
+    entries = manifest.add(expand_source(args.source))
+    pending = [(source, name) for source, name in entries if not manifest.is_done(source)]
+    print(f"{len(entries)} items, {len(entries) - len(pending)} already done")
+    if not pending:
+        return
+    
+    worker = TranscriptionWorker(worker_args=['--jobs', str(args.jobs)] if args.jobs else None)
+    if args.model != 'auto':
+        worker.preload(args.model, token_manager.get_token(), diarize=bool(speaker_names),
+                       compute_type=args.compute_type)
+    selector = ModelSelector(token_manager)
+    downloader = AudioDownloader(cache=None if args.no_cache else make_audio_cache(token_manager))
+    total = len(pending)
+    
+    def cleanup(item):
+        if item.get("workspace"):
+            item["workspace"].close()
+        if item.get("pcm") and os.path.exists(item["pcm"]):
+            os.remove(item["pcm"])
+    
+    # Each stage runs on its own thread; items are dicts passed down the pipeline
+    def download(entry):
+        number, (source, name) = entry
+        item = {"source": source, "name": name, "number": number, "started": time.time(), "metrics": StageMetrics()}
+        print(f"[{item['number']}/{total}] Downloading {source}")
+        with item["metrics"].stage("download"):
+            if os.path.isfile(source):
+                item["audio"], item["title"], item["duration"] = source, os.path.basename(source), 0
+            else:
+                workspace = item["workspace"] = JobWorkspace()
+                audio, item["title"], item["duration"] = downloader.download(
+                    source, output_path=workspace.file("download.webm"))
+                item["audio"] = workspace.adopt(audio)
+        manifest.update(source, status="downloaded", title=item["title"], duration=item["duration"], error=None)
+        return item
+    
+    def decode(item):
+        # Decoded PCM is picked up by the worker from pcm_dir, so ffmpeg runs here, off the worker's clock
+        with item["metrics"].stage("decode"):
+            digest = file_digest(item["audio"])
+            if item.get("workspace"):  # downloaded, not a local file
+                ResultStore().link_source(item["source"], digest, item["title"], item["duration"])
+            item["audio_seconds"] = len(load_pcm(item["audio"], cache_dir=pcm_dir, digest=digest)) / SAMPLE_RATE
+        item["pcm"] = os.path.join(pcm_dir, f"{digest}-{SAMPLE_RATE}.pcm")
+        manifest.update(item["source"], status="decoded")
+        return item
+    
+    def transcribe(item):
+        model_size, predicted = args.model, None
+        if args.model == 'auto':
+            model_size, predicted = selector.choose(item["audio_seconds"], args.deadline, diarize=bool(speaker_names))
+        print(f"[{item['number']}/{total}] Transcribing {item['title']}"
+              + (f" with {model_size} (predicted {predicted:.0f}s)" if predicted is not None else ""))
+        started = time.time()
+        result = worker.transcribe(item["audio"], model_size, speaker_names=speaker_names,
+                                   hf_token=token_manager.get_token(), pcm_cache_dir=pcm_dir, shards=args.shards,
+                                   batch_size=args.batch_size, compute_type=args.compute_type, vad=args.vad)
+        selector.record_job(result, time.time() - started, item["audio_seconds"],
+                            diarize=bool(speaker_names), predicted=predicted)
+        if os.path.exists(item["pcm"]):  # another item with identical audio may have removed it
+            os.remove(item["pcm"])
+        item["result"] = result
+        item["metrics"].merge(result.get("metrics"))
+        manifest.update(item["source"], status="transcribed")
+        return item
+    
+    def format_output(item):
+        result = item.pop("result")
+        paths = output_paths(os.path.join(args.output_dir, item["name"] + FORMATS[args.format[0]]), args.format)
+        with item["metrics"].stage("format"):
+            OutputFormatter.save_all(paths, result["segments"], item["title"], item["duration"],
+                                     result["model"], result.get("diarization_method"))
+        cleanup(item)
+        metrics = item["metrics"]
+        metrics.audio_seconds = metrics.audio_seconds or item["duration"] or None
+        # Absolute, like the sources, so is_done still finds them when resumed from another directory
+        manifest.update(item["source"], status="done", outputs=[os.path.abspath(p) for p in paths.values()],
+                        model=result["model"],
+                        diarization_method=result.get("diarization_method"),
+                        seconds=round(time.time() - item["started"], 2),
+                        stages={name: round(stage["wall_s"], 2) for name, stage in metrics.as_dict()["stages"].items()})
+        print(f"[{item['number']}/{total}] Done: {', '.join(paths.values())}")
+    
+    def on_error(item, stage, error):
+        source = item[1][0] if isinstance(item, tuple) else item["source"]
+        if isinstance(item, dict):
+            cleanup(item)
+        manifest.update(source, status="failed", error=f"{stage}: {error}")
+        print(f"FAILED ({stage}) {source}: {error}")
+    
+    try:
+        run_pipeline(enumerate(pending, 1), [("download", download), ("decode", decode),
+                               ("transcribe", transcribe), ("format", format_output)], on_error=on_error)
+    finally:
+        worker.stop()
+    
+    counts = manifest.counts()
+    print(f"Batch finished: {counts.get('done', 0)} done, {counts.get('failed', 0)} failed "
+          f"(status in {manifest.path})")
+    if counts.get('failed'):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
     try:
-        if len(sys.argv) > 1 and not sys.argv[1].startswith('-'):
+        if len(sys.argv) > 1 and sys.argv[1] in ('render', 'relabel'):
+            render_main()
+        elif len(sys.argv) > 1 and sys.argv[1] == 'batch':
+            batch_main()
+        elif len(sys.argv) > 1 and (not sys.argv[1].startswith('-') or sys.argv[1] in ('-h', '--help')):
             cli_main()
         else:
             app = TranscriptGUI()
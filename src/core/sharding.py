@@ -0,0 +1,157 @@
+"""
+Sharded CPU transcription of a single long file.
+The audio is cut at quiet points into N core ranges, each padded with a few
+seconds of overlap, and the shards are transcribed in a pool of worker
+processes that each hold their own CTranslate2 model. Segments are shifted
+back onto the global timeline and stitched by midpoint, which drops the
+duplicates produced in the overlap regions.
+"""
+
+import os
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+try:
+    from src.core.audio_buffer import find_quiet_point, open_pcm, SAMPLE_RATE
+except ImportError:
+    from audio_buffer import find_quiet_point, open_pcm, SAMPLE_RATE
+
+# Model loaded once per pool process by _init_process
+_MODEL = None
+
+
+def plan_shards(audio, num_shards, overlap_seconds=5.0, sr=SAMPLE_RATE):
+    """
+    Return [(core_start, core_end, start, end), ...] in samples. Core ranges
+    tile the audio exactly; start/end add the overlap on both sides.
+    """
+    total = len(audio)
+    step = total / float(num_shards)
+    search = min(30.0, step / sr / 4.0)
+    cuts = [0]
+    for i in range(1, num_shards):
+        cut = find_quiet_point(audio, i * step / sr, search, sr)
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * sr)
+    return [(core_start, core_end, max(0, core_start - overlap), min(total, core_end + overlap))
+            for core_start, core_end in zip(cuts[:-1], cuts[1:])]
+
+
+def _init_process(model_size, compute_type, threads):
+    global _MODEL
+    # Before anything imports torch/CTranslate2, so their pools match this shard's share
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[name] = str(threads)
+    import whisperx
+    _MODEL = whisperx.load_model(model_size, "cpu", compute_type=compute_type, threads=threads)
+
+
+def _transcribe_shard(pcm_path, start, end, batch_size):
+    audio = open_pcm(pcm_path)
+    result = _MODEL.transcribe(audio[start:end], batch_size=batch_size)
+    offset = start / SAMPLE_RATE
+    segments = []
+    for seg in result["segments"]:
+        seg = dict(seg)
+        seg["start"] = seg["start"] + offset
+        seg["end"] = seg["end"] + offset
+        segments.append(seg)
+    return segments, result.get("language", "en")
+
+
+def stitch(shards, shard_segments, sr=SAMPLE_RATE):
+    """
+    Merge per-shard segments in order. A shard hands everything whose
+    midpoint lies past its core range to the next shard, and the next shard
+    skips whatever the previous one already covered.
+    """
+    stitched = []
+    last = len(shards) - 1
+    for index, ((core_start, core_end, _, _), segments) in enumerate(zip(shards, shard_segments)):
+        boundary = core_end / sr
+        for seg in segments:
+            midpoint = (seg["start"] + seg["end"]) / 2.0
+            if index < last and midpoint >= boundary:
+                continue
+            if stitched and midpoint < stitched[-1]["end"]:
+                continue
+            # Both shards sometimes emit the same phrase either side of the cut
+            if (stitched and seg["start"] < stitched[-1]["end"]
+                    and seg["text"].strip().lower() == stitched[-1]["text"].strip().lower()):
+                continue
+            stitched.append(seg)
+    return stitched
+
+
+def transcribe_sharded(audio, model_size, num_shards, batch_size=2, compute_type="int8",
+                       overlap_seconds=5.0, done=None, on_shard_done=None, progress_callback=None,
+                       on_segments=None, threads=None):
+    """
+    Transcribe audio with num_shards processes. done maps shard index ->
+    (segments, language) for shards finished by an earlier attempt; they are
+    not re-run. on_shard_done(index, segments, language) fires as each new
+    shard finishes. on_segments(segments) receives the stitched transcript in
+    order, as soon as each leading run of shards is complete. threads is
+    the CPU budget shared by all shard processes (default: every core).
+    Returns (segments, language).
+    """
+    shards = plan_shards(audio, num_shards, overlap_seconds)
+    results = dict(done or {})
+    pending = [i for i in range(len(shards)) if i not in results]
+
+    emitted = []
+    def emit_ready():
+        # stitch() is sequential, so stitching the finished prefix gives a prefix of the final result
+        if not on_segments:
+            return
+        prefix = []
+        while len(prefix) < len(shards) and len(prefix) in results:
+            prefix.append(results[len(prefix)][0])
+        stitched = stitch(shards, prefix)
+        if len(stitched) > len(emitted):
+            on_segments(stitched[len(emitted):])
+            emitted.extend(stitched[len(emitted):])
+
+    emit_ready()
+
+    if pending:
+        # Workers read the audio through a memory map instead of pickling it
+        pcm_path = getattr(audio, "filename", None)
+        tmp_path = None
+        if not pcm_path:
+            fd, tmp_path = tempfile.mkstemp(suffix=".pcm")
+            os.close(fd)
+            np.asarray(audio, dtype=np.float32).tofile(tmp_path)
+            pcm_path = tmp_path
+
+        threads = max(1, (threads or os.cpu_count() or 1) // len(pending))
+        context = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=len(pending), mp_context=context,
+                                     initializer=_init_process,
+                                     initargs=(model_size, compute_type, threads)) as pool:
+                futures = {pool.submit(_transcribe_shard, pcm_path, shards[i][2], shards[i][3], batch_size): i
+                           for i in pending}
+                for future in as_completed(futures):
+                    index = futures[future]
+                    segments, language = future.result()
+                    results[index] = (segments, language)
+                    if on_shard_done:
+                        on_shard_done(index, segments, language)
+                    emit_ready()
+                    if progress_callback:
+                        progress_callback(30 + int(30 * len(results) / len(shards)),
+                                          f"Transcribing audio ({len(results)}/{len(shards)} shards)...")
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    ordered = [results[i][0] for i in range(len(shards))]
+    language = next((results[i][1] for i in range(len(shards)) if results[i][1]), "en")
+    return stitch(shards, ordered), language
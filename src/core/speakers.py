@@ -0,0 +1,190 @@
+"""
+Speaker label handling shared by the engine and the render/relabel path.
+"""
+
+import numpy as np
+
+# Label used when diarization didn't run or didn't assign a speaker
+GENERIC_SPEAKER = "Speaker"
+
+
+def speaker_mapping(labels, speaker_names):
+    """
+    Map diarization labels (in order of first appearance) to the
+    user-provided names; labels beyond the provided names become Speaker_<n>.
+    """
+    mapping = {}
+    if not speaker_names:
+        return mapping
+
+    if len(speaker_names) >= 2:
+        for label in labels:
+            if label != GENERIC_SPEAKER and label not in mapping:
+                if len(mapping) < len(speaker_names):
+                    mapping[label] = speaker_names[len(mapping)]
+                else:
+                    mapping[label] = f"Speaker_{len(mapping) + 1}"
+
+    # Replace any remaining generic IDs (e.g. a single provided name)
+    generic = {f"SPEAKER_{i:02d}": name for i, name in enumerate(speaker_names)}
+    for label in labels:
+        mapped = mapping.get(label, label)
+        mapping[label] = generic.get(mapped, mapped)
+    return mapping
+
+
+def apply_speaker_names(segments, speaker_names):
+    """
+    Return segments with diarization labels replaced by the user-provided
+    names (see speaker_mapping). A Transcript is relabeled without copying
+    its arrays; a list of dicts is returned as new dicts.
+    """
+    if hasattr(segments, "relabel"):
+        return segments.relabel(speaker_mapping(segments.speaker_order(), speaker_names))
+
+    segments = [dict(seg) for seg in segments]
+    mapping = speaker_mapping([seg.get("speaker", GENERIC_SPEAKER) for seg in segments], speaker_names)
+    for seg in segments:
+        label = seg.get("speaker", GENERIC_SPEAKER)
+        seg["speaker"] = mapping.get(label, label)
+    return segments
+
+
+def _interval_index(turns):
+    """
+    Per-speaker lookup arrays for diarization turns given as [start, end, label]
+    rows. Each speaker's turns are sorted and merged where they overlap, so
+    the time that speaker covers up to t is a prefix sum plus one partial
+    turn: labels, [(starts, ends, covered_before), ...].
+    """
+    grouped = {}
+    for start, end, label in turns:
+        rows = grouped.setdefault(label, ([], []))
+        rows[0].append(start)
+        rows[1].append(end)
+
+    labels = list(grouped)
+    index = []
+    for label in labels:
+        starts = np.asarray(grouped[label][0], dtype=np.float64)
+        ends = np.asarray(grouped[label][1], dtype=np.float64)
+        order = np.argsort(starts, kind="stable")
+        starts, ends = starts[order], np.maximum(ends[order], starts[order])
+
+        # A turn opens a new run unless it starts before every earlier turn ended
+        reach = np.maximum.accumulate(ends)
+        opens = np.flatnonzero(np.r_[True, starts[1:] > reach[:-1]])
+        starts, ends = starts[opens], np.maximum.reduceat(ends, opens)
+
+        durations = ends - starts
+        covered_before = np.r_[0.0, np.cumsum(durations)[:-1]]
+        index.append((starts, ends, covered_before))
+    return labels, index
+
+
+def _covered(index_entry, t):
+    """Seconds of one speaker's speech before each time in t"""
+    starts, ends, covered_before = index_entry
+    i = np.searchsorted(starts, t, side="right") - 1
+    valid = i >= 0
+    i = np.maximum(i, 0)
+    partial = np.clip(t - starts[i], 0.0, ends[i] - starts[i])
+    return np.where(valid, covered_before[i] + partial, 0.0)
+
+
+def speakers_for_intervals(starts, ends, turns):
+    """
+    Label with the most overlap for each [start, end] interval, or None where
+    no turn overlaps it. Turns are [start, end, label] rows; the work is
+    O((N + T) log T) per speaker with N intervals and T turns.
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    ends = np.asarray(ends, dtype=np.float64)
+    if not len(starts) or not turns:
+        return [None] * len(starts)
+
+    labels, index = _interval_index(turns)
+    overlap = np.empty((len(labels), len(starts)))
+    for row, entry in enumerate(index):
+        overlap[row] = _covered(entry, ends) - _covered(entry, starts)
+
+    best = np.argmax(overlap, axis=0)
+    found = overlap[best, np.arange(len(starts))] > 0
+    return [labels[b] if ok else None for b, ok in zip(best.tolist(), found.tolist())]
+
+
+def assign_speakers(segments, turns):
+    """
+    Return copies of aligned segments with a speaker on every segment and
+    every timed word, chosen by largest overlap with the diarization turns
+    (same rule as whisperx.assign_word_speakers). Untouched where nothing
+    overlaps.
+    """
+    segments = [dict(seg) for seg in segments]
+    words = []
+    for seg in segments:
+        if "words" in seg:
+            seg["words"] = [dict(word) for word in seg["words"]]
+            words.extend(word for word in seg["words"] if "start" in word and "end" in word)
+
+    # One lookup over segments and words together
+    intervals = segments + words
+    labels = speakers_for_intervals([item["start"] for item in intervals],
+                                    [item["end"] for item in intervals], turns)
+    for item, label in zip(intervals, labels):
+        if label is not None:
+            item["speaker"] = label
+    return segments
+
+
+def _piece(seg, words, speaker):
+    timed = [word for word in words if "start" in word and "end" in word]
+    return {
+        "start": timed[0]["start"] if timed else seg["start"],
+        "end": timed[-1]["end"] if timed else seg["end"],
+        # Whisper segment text carries a leading space; keep that shape
+        "text": " " + " ".join(word["word"].strip() for word in words),
+        "speaker": speaker or seg.get("speaker", GENERIC_SPEAKER),
+        "words": words
+    }
+
+
+def split_segments(segments, max_duration=30.0, min_pause=0.5):
+    """
+    Split aligned segments using their word timestamps in a single pass.
+    A segment is cut wherever the word-level speaker changes, and a piece
+    longer than max_duration is also cut at the next pause of at least
+    min_pause seconds. Times come from the words themselves; segments
+    without words (or that need no cut) are passed through unchanged.
+    """
+    result = []
+    for seg in segments:
+        words = seg.get("words") or []
+        pieces = []
+        current, speaker, piece_start, last_end = [], None, None, None
+
+        for word in words:
+            label = word.get("speaker")
+            timed = "start" in word and "end" in word
+            # Cuts only happen before a timed word, so every piece has exact bounds
+            if current and timed and last_end is not None:
+                changed = label is not None and speaker is not None and label != speaker
+                long_pause = (word["end"] - piece_start > max_duration
+                              and word["start"] - last_end >= min_pause)
+                if changed or long_pause:
+                    pieces.append((current, speaker))
+                    current, speaker, piece_start = [], None, None
+            current.append(word)
+            if speaker is None:
+                speaker = label
+            if timed:
+                if piece_start is None:
+                    piece_start = word["start"]
+                last_end = word["end"]
+
+        if len(pieces) == 0:
+            result.append(seg)
+            continue
+        pieces.append((current, speaker))
+        result.extend(_piece(seg, piece_words, piece_speaker) for piece_words, piece_speaker in pieces)
+    return result
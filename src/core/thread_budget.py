@@ -0,0 +1,114 @@
+"""
+CPU thread budget shared by the transcription jobs on one host.
+Each worker process holds a lease file in ~/.scriptotic/threads while it
+runs a job (a warm worker releases it while idle), and the host's cores are
+split evenly between the live leases (or between an explicit number of
+jobs). A worker applies its share to everything that spins up its own
+thread pool:
+  - OMP/MKL/OpenBLAS env vars, set before torch or CTranslate2 is imported;
+    these stay at the share the worker started with
+  - torch.set_num_threads (alignment, pyannote), before each job
+  - CTranslate2 cpu_threads, which is fixed when the Whisper model is
+    loaded, so a warm worker reloads the model when its share changes.
+    CTranslate2 num_workers (parallel calls into one model) stays at 1:
+    whisperx.load_model doesn't expose it, and a job sends its batches one
+    at a time, so more workers would only hold more buffers
+  - the per-process share of sharded transcription
+Without this every library sizes its pool to the whole machine and a few
+concurrent jobs oversubscribe the CPU many times over.
+"""
+
+import os
+import sys
+import atexit
+from pathlib import Path
+
+ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+
+
+def host_cores():
+    """Cores this process may use (affinity-aware); SCRIPTOTIC_CPU_THREADS overrides"""
+    override = os.getenv("SCRIPTOTIC_CPU_THREADS")
+    if override:
+        return max(1, int(override))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _pid_alive(pid):
+    if sys.platform == "win32":
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ThreadBudget:
+    """This process's share of the host's cores"""
+
+    def __init__(self, jobs=None, lease_dir=None):
+        self.jobs = jobs  # fixed number of concurrent jobs; None counts live leases
+        self.lease_dir = Path(lease_dir) if lease_dir else Path.home() / ".scriptotic" / "threads"
+        self.lease_dir.mkdir(parents=True, exist_ok=True)
+        self.lease = self.lease_dir / f"{os.getpid()}.lease"
+        self.acquire()
+        atexit.register(self.release)
+        self.threads = self.refresh()
+
+    def active_jobs(self):
+        """Number of live leases (this one included); leases of dead processes are removed"""
+        count = 0
+        for lease in self.lease_dir.glob("*.lease"):
+            try:
+                pid = int(lease.stem)
+            except ValueError:
+                continue
+            if pid == os.getpid() or _pid_alive(pid):
+                count += 1
+            else:
+                try:
+                    lease.unlink()
+                except OSError:
+                    pass
+        return max(1, count)
+
+    def refresh(self):
+        """Recompute the share (e.g. before each job, as other jobs come and go)"""
+        self.threads = max(1, host_cores() // (self.jobs or self.active_jobs()))
+        return self.threads
+
+    def apply_env(self):
+        """Size OpenMP/MKL pools; only effective before torch/CTranslate2 are imported"""
+        for name in ENV_VARS:
+            os.environ[name] = str(self.threads)
+
+    def apply_torch(self):
+        """Resize torch's intra-op pool if torch is loaded"""
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(self.threads)
+
+    def acquire(self):
+        """Take (or keep) this process's lease, e.g. when a warm worker starts a job"""
+        self.lease.write_text(str(os.getpid()))
+
+    def release(self):
+        """Give the lease up, e.g. while a warm worker is idle"""
+        try:
+            self.lease.unlink()
+        except OSError:
+            pass
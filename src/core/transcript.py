@@ -0,0 +1,190 @@
+"""
+Compact transcript storage for long recordings.
+Segments and their aligned words are kept in parallel typed arrays (times,
+interned speaker IDs, end offsets into one shared text buffer) instead of a
+dict per segment and per word. Indexing or iterating a Transcript yields
+read-only dict-compatible views, so OutputFormatter and anything else that
+reads seg["start"] / seg["text"] / seg["speaker"] keeps working.
+"""
+
+import sys
+import copy
+import base64
+from array import array
+from collections.abc import Mapping
+
+NO_SPEAKER = -1
+
+
+def _pack(values):
+    return base64.b64encode(values.tobytes()).decode('ascii')
+
+
+def _unpack(typecode, data, byteorder):
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    return values
+
+
+class Segment(Mapping):
+    """Dict-compatible view of one segment: start, end, text, speaker, words"""
+    __slots__ = ("_transcript", "_index")
+    _KEYS = ("start", "end", "text", "speaker", "words")
+
+    def __init__(self, transcript, index):
+        self._transcript = transcript
+        self._index = index
+
+    def __getitem__(self, key):
+        t, i = self._transcript, self._index
+        if key == "start":
+            return t.seg_start[i]
+        if key == "end":
+            return t.seg_end[i]
+        if key == "text":
+            return t.text[t.seg_text_end[i - 1] if i else 0:t.seg_text_end[i]]
+        if key == "speaker":
+            return t.speakers[t.seg_speaker[i]]
+        if key == "words":
+            return t.words_of(i)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class Transcript:
+    """Array-backed list of segments (with their words) from one transcription"""
+
+    def __init__(self):
+        self.speakers = []                # interned labels; *_speaker arrays index into this
+        self._speaker_ids = {}
+        self.seg_start = array('d')
+        self.seg_end = array('d')
+        self.seg_speaker = array('i')
+        self.seg_text_end = array('q')    # end offset of each segment's text in self.text
+        self.seg_word_end = array('q')    # end index of each segment's words
+        self.word_start = array('d')      # NaN for words alignment couldn't place
+        self.word_end = array('d')
+        self.word_speaker = array('i')    # NO_SPEAKER when diarization didn't label the word
+        self.word_text_end = array('q')
+        self.text = ""
+        self.word_text = ""
+
+    def _intern(self, label):
+        speaker_id = self._speaker_ids.get(label)
+        if speaker_id is None:
+            speaker_id = self._speaker_ids[label] = len(self.speakers)
+            self.speakers.append(label)
+        return speaker_id
+
+    @classmethod
+    def from_segments(cls, segments, default_speaker="Speaker", keep_words=True):
+        """Build from segment dicts (optionally carrying whisperx "words" lists)"""
+        t = cls()
+        texts, word_texts = [], []
+        text_len = word_text_len = 0
+        nan = float("nan")
+        for seg in segments:
+            t.seg_start.append(seg["start"])
+            t.seg_end.append(seg["end"])
+            t.seg_speaker.append(t._intern(seg.get("speaker") or default_speaker))
+            text = seg.get("text", "")
+            texts.append(text)
+            text_len += len(text)
+            t.seg_text_end.append(text_len)
+
+            for word in (seg.get("words") or []) if keep_words else []:
+                t.word_start.append(word.get("start", nan))
+                t.word_end.append(word.get("end", nan))
+                label = word.get("speaker")
+                t.word_speaker.append(NO_SPEAKER if label is None else t._intern(label))
+                text = word.get("word", "")
+                word_texts.append(text)
+                word_text_len += len(text)
+                t.word_text_end.append(word_text_len)
+            t.seg_word_end.append(len(t.word_start))
+
+        t.text = "".join(texts)
+        t.word_text = "".join(word_texts)
+        return t
+
+    def __len__(self):
+        return len(self.seg_start)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return Segment(self, index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Segment(self, i)
+
+    def words_of(self, index):
+        """Word dicts of one segment (start/end omitted where alignment failed)"""
+        words = []
+        first = self.seg_word_end[index - 1] if index else 0
+        for w in range(first, self.seg_word_end[index]):
+            word = {"word": self.word_text[self.word_text_end[w - 1] if w else 0:self.word_text_end[w]]}
+            if self.word_start[w] == self.word_start[w]:  # not NaN
+                word["start"] = self.word_start[w]
+                word["end"] = self.word_end[w]
+            if self.word_speaker[w] != NO_SPEAKER:
+                word["speaker"] = self.speakers[self.word_speaker[w]]
+            words.append(word)
+        return words
+
+    def segments(self, words=False):
+        """Plain segment dicts, e.g. for code that mutates them"""
+        keys = Segment._KEYS if words else Segment._KEYS[:4]
+        return [{key: seg[key] for key in keys} for seg in self]
+
+    def speaker_order(self):
+        """Segment speaker labels in order of first appearance"""
+        return [self.speakers[i] for i in dict.fromkeys(self.seg_speaker)]
+
+    def relabel(self, mapping):
+        """Copy sharing all arrays, with labels renamed through mapping (label -> new label)"""
+        relabeled = copy.copy(self)
+        relabeled.speakers = [mapping.get(label, label) for label in self.speakers]
+        relabeled._speaker_ids = {label: i for i, label in reversed(list(enumerate(relabeled.speakers)))}
+        return relabeled
+
+    def to_dict(self):
+        """JSON-ready form; arrays travel as base64 so multi-hour transcripts stay cheap to encode"""
+        return {
+            "byteorder": sys.byteorder,
+            "speakers": self.speakers,
+            "text": self.text,
+            "word_text": self.word_text,
+            "arrays": {name: [values.typecode, _pack(values)] for name, values in self._arrays()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        t = cls()
+        t.speakers = list(data["speakers"])
+        t._speaker_ids = {label: i for i, label in enumerate(t.speakers)}
+        t.text = data["text"]
+        t.word_text = data["word_text"]
+        for name, (typecode, packed) in data["arrays"].items():
+            setattr(t, name, _unpack(typecode, packed, data["byteorder"]))
+        return t
+
+    def _arrays(self):
+        for name in ("seg_start", "seg_end", "seg_speaker", "seg_text_end", "seg_word_end",
+                     "word_start", "word_end", "word_speaker", "word_text_end"):
+            yield name, getattr(self, name)
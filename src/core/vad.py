@@ -0,0 +1,190 @@
+"""
+Voice-activity pre-pass.
+Finds the speech regions of a recording once, from frame energy, and skips
+long steady stretches (music beds, jingles) using the low short-time energy
+ratio: speech dips between syllables many times a second, music mostly
+doesn't. The regions become a SpeechIndex that packs the speech into one
+shorter buffer (with a short pause between regions) for ASR, alignment and
+diarization, and maps their timestamps back onto the original timeline.
+"""
+
+import numpy as np
+
+try:
+    from src.core.audio_buffer import SAMPLE_RATE
+except ImportError:
+    from audio_buffer import SAMPLE_RATE
+
+VAD_VERSION = 1            # part of the cache key of every stage run on packed audio
+FRAME_SECONDS = 0.02
+GAP_SECONDS = 0.3          # silence kept between packed regions so words don't run together
+
+
+def frame_energy(audio, sr=SAMPLE_RATE, frame=FRAME_SECONDS, block_seconds=60):
+    """Mean-square energy per frame, computed block by block (audio may be a multi-hour memmap)"""
+    frame_len = max(1, int(frame * sr))
+    frames = len(audio) // frame_len
+    energy = np.empty(frames, dtype=np.float32)
+    block = max(1, int(block_seconds / frame))
+    for first in range(0, frames, block):
+        count = min(block, frames - first)
+        chunk = np.asarray(audio[first * frame_len:(first + count) * frame_len], dtype=np.float32)
+        energy[first:first + count] = np.square(chunk).reshape(count, frame_len).mean(axis=1)
+    return energy
+
+
+def _runs(mask):
+    """[(start, end), ...] index ranges where mask is True"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+
+def music_frames(energy, frame=FRAME_SECONDS, window=1.0, max_lster=0.03, min_seconds=10.0):
+    """
+    Frames inside long runs of steady (music-like) sound. LSTER is the share
+    of frames in a one-second window below half its mean energy; speech
+    typically scores 0.15-0.5, sustained music close to 0. Only runs of at
+    least min_seconds count, so speech over a music bed is kept.
+    """
+    per_window = max(1, int(window / frame))
+    windows = len(energy) // per_window
+    mask = np.zeros(len(energy), dtype=bool)
+    if windows == 0:
+        return mask
+    grid = energy[:windows * per_window].reshape(windows, per_window)
+    lster = (grid < 0.5 * grid.mean(axis=1, keepdims=True)).mean(axis=1)
+    loud = grid.mean(axis=1) > np.percentile(energy, 50) * 0.1
+    steady = (lster <= max_lster) & loud
+    for start, end in _runs(steady):
+        if (end - start) * window >= min_seconds:
+            mask[start * per_window:end * per_window] = True
+    return mask
+
+
+def detect_speech(audio, sr=SAMPLE_RATE, margin_db=10.0, floor_db=-50.0, pad=0.3, min_gap=0.6,
+                  min_speech=0.25, skip_music=True):
+    """
+    Speech regions as [(start, end), ...] in samples. A frame is active
+    when it is margin_db above the recording's noise floor (10th percentile)
+    and above floor_db; regions are padded, gaps shorter than min_gap closed
+    and blips shorter than min_speech dropped.
+    """
+    energy = frame_energy(audio, sr)
+    if len(energy) == 0:
+        return []
+    db = 10.0 * np.log10(energy + 1e-10)
+    active = db > max(np.percentile(db, 10) + margin_db, floor_db)
+    if skip_music:
+        active &= ~music_frames(energy)
+
+    pad_frames = int(pad / FRAME_SECONDS)
+    if pad_frames:
+        active = np.convolve(active, np.ones(2 * pad_frames + 1), mode="same") > 0
+
+    regions = []
+    for start, end in _runs(active):
+        if regions and (start - regions[-1][1]) * FRAME_SECONDS < min_gap:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+    frame_len = int(FRAME_SECONDS * sr)
+    return [(int(start) * frame_len, min(len(audio), int(end) * frame_len))
+            for start, end in regions if (end - start) * FRAME_SECONDS >= min_speech]
+
+
+class SpeechIndex:
+    """Speech regions of one recording and the mapping between packed and original time"""
+
+    def __init__(self, regions, total, sr=SAMPLE_RATE, gap=GAP_SECONDS):
+        self.sr = sr
+        self.total = total
+        self.starts = np.array([start for start, _ in regions], dtype=np.int64)
+        self.ends = np.array([end for _, end in regions], dtype=np.int64)
+        self.lengths = self.ends - self.starts
+        # Packed start of every region: earlier regions plus one gap after each
+        step = self.lengths + int(gap * sr)
+        self.offsets = np.concatenate(([0], np.cumsum(step)[:-1])).astype(np.int64)
+
+    @classmethod
+    def detect(cls, audio, sr=SAMPLE_RATE, **options):
+        return cls(detect_speech(audio, sr, **options), len(audio), sr)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def speech_seconds(self):
+        return float(self.lengths.sum()) / self.sr
+
+    def coverage(self):
+        """Fraction of the recording that is speech"""
+        return float(self.lengths.sum()) / self.total if self.total else 0.0
+
+    def compact(self, audio):
+        """Speech regions packed into one float32 buffer"""
+        if not len(self):
+            return np.zeros(0, dtype=np.float32)
+        packed = np.zeros(int(self.offsets[-1] + self.lengths[-1]), dtype=np.float32)
+        for start, end, offset in zip(self.starts, self.ends, self.offsets):
+            packed[offset:offset + (end - start)] = audio[start:end]
+        return packed
+
+    def to_original(self, times):
+        """Map packed-time seconds (scalar or sequence) to original-time seconds"""
+        t = np.asarray(times, dtype=np.float64) * self.sr
+        i = np.clip(np.searchsorted(self.offsets, t, side="right") - 1, 0, len(self) - 1)
+        # Times inside a gap belong to the end of the region before it
+        within = np.clip(t - self.offsets[i], 0, self.lengths[i])
+        return np.round((self.starts[i] + within) / self.sr, 3)
+
+    def map_segments(self, segments):
+        """Copies of whisperx segments (and their words) with original-timeline times"""
+        times = []
+        for seg in segments:
+            times += [seg["start"], seg["end"]]
+            times += [t for word in seg.get("words") or [] if "start" in word for t in (word["start"], word["end"])]
+        mapped = iter(self.to_original(times).tolist()) if times else iter(())
+
+        result = []
+        for seg in segments:
+            seg = dict(seg)
+            seg["start"], seg["end"] = next(mapped), next(mapped)
+            if seg.get("words"):
+                words = []
+                for word in seg["words"]:
+                    if "start" in word:
+                        word = dict(word, start=next(mapped), end=next(mapped))
+                    words.append(word)
+                seg["words"] = words
+            result.append(seg)
+        return result
+
+    def map_result(self, result):
+        """A whisperx result dict ({"segments", ...}) moved onto the original timeline"""
+        result = dict(result)
+        result["segments"] = self.map_segments(result["segments"])
+        if result.get("word_segments"):
+            result["word_segments"] = [w for seg in result["segments"] for w in seg.get("words") or []]
+        return result
+
+    def map_turns(self, turns):
+        """Diarization turns [start, end, label], split wherever they span skipped audio"""
+        mapped = []
+        for start, end, label in turns:
+            s, e = start * self.sr, end * self.sr
+            first = max(0, int(np.searchsorted(self.offsets, s, side="right")) - 1)
+            last = max(0, int(np.searchsorted(self.offsets, e, side="right")) - 1)
+            for i in range(first, min(last, len(self) - 1) + 1):
+                lo = max(s, self.offsets[i])
+                hi = min(e, self.offsets[i] + self.lengths[i])
+                if hi > lo:
+                    mapped.append([round(float(self.starts[i] + lo - self.offsets[i]) / self.sr, 3),
+                                   round(float(self.starts[i] + hi - self.offsets[i]) / self.sr, 3), label])
+        return mapped
+
+    def to_dict(self):
+        return {"sr": self.sr, "total": int(self.total),
+                "regions": [[int(s), int(e)] for s, e in zip(self.starts, self.ends)]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([tuple(region) for region in data["regions"]], data["total"], data["sr"])
@@ -1,6 +1,46 @@
 # src/core/whisperx_engine.py
-import os, whisperx, torch, tempfile
-from datetime import timedelta
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from src.core.audio_buffer import load_pcm, file_digest, duration_of, plan_windows, SAMPLE_RATE
+    from src.core.speakers import apply_speaker_names, assign_speakers, split_segments, GENERIC_SPEAKER
+    from src.core.sharding import transcribe_sharded
+    from src.core.model_registry import REGISTRY
+    from src.core.transcript import Transcript
+    from src.core.metrics import StageMetrics
+    from src.core.vad import SpeechIndex, VAD_VERSION
+    from src.core.progressive import use_draft, DRAFT_WINDOW_SECONDS, REFINE_WINDOW_SECONDS
+    from src.core.autotune import BatchSizeTuner, ComputeTypeTuner, CPU_COMPUTE_TYPES, is_out_of_memory, release_memory
+except ImportError:
+    from audio_buffer import load_pcm, file_digest, duration_of, plan_windows, SAMPLE_RATE
+    from speakers import apply_speaker_names, assign_speakers, split_segments, GENERIC_SPEAKER
+    from sharding import transcribe_sharded
+    from model_registry import REGISTRY
+    from transcript import Transcript
+    from metrics import StageMetrics
+    from vad import SpeechIndex, VAD_VERSION
+    from progressive import use_draft, DRAFT_WINDOW_SECONDS, REFINE_WINDOW_SECONDS
+    from autotune import BatchSizeTuner, ComputeTypeTuner, CPU_COMPUTE_TYPES, is_out_of_memory, release_memory
+
+def _whisperx():
+    """whisperx, imported on first use (engines with other backends never load it)"""
+    import whisperx
+    return whisperx
+
+def _torch():
+    import torch
+    return torch
+
+def _offset_segments(segments, offset):
+    """Copies of window-relative segments moved offset seconds later"""
+    shifted = []
+    for seg in segments:
+        seg = dict(seg)
+        seg["start"] = seg["start"] + offset
+        seg["end"] = seg["end"] + offset
+        shifted.append(seg)
+    return shifted
 
 class WhisperXEngine:
     """
@@ -9,16 +49,27 @@ class WhisperXEngine:
     """
 
     def __init__(self, model_size="base", device=None, progress_callback=None,
-                 hf_token=None):
+                 hf_token=None, result_store=None, window_seconds=600, registry=None,
+                 segment_callback=None, compute_type=None, cpu_threads=None, draft_callback=None):
         self.debug = os.getenv("WHISPERX_DEBUG", "false").lower() == "true"
         if self.debug:
             print(f"DEBUG: WhisperX engine starting initialization...")
             
         self.progress_callback = progress_callback
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.dtype  = torch.float16 if self.device == "cuda" else torch.float32
+        self.segment_callback = segment_callback  # receives raw segments as each part is transcribed
+        self.draft_callback = draft_callback  # receives draft-model segments in progressive mode
+        self.device = device or ("cuda" if _torch().cuda.is_available() else "cpu")
         self.model_size = model_size  # Store for output formatting
         self.hf_token = hf_token or os.getenv("HUGGINGFACE_TOKEN")
+        self.registry = registry or REGISTRY  # models are shared by every engine in the process
+        self.result_store = result_store  # optional ResultStore for stage caching
+        self.window_seconds = window_seconds  # long audio is transcribed in windows this long (0 = never)
+        self.batch_size = None  # ASR batch size of the current job (see _transcribe)
+        self._batch_tuner = None
+        self.requested_compute_type = compute_type  # None/"auto" = tuned CPU precision, else as given
+        self.cpu_threads = cpu_threads  # this worker's share of the host's cores (ThreadBudget)
+        if cpu_threads:
+            self._set_torch_threads(cpu_threads)
 
         if self.debug:
             print(f"DEBUG: Using device: {self.device}, model: {model_size}")
@@ -30,7 +81,8 @@ class WhisperXEngine:
         
         # whisperx automatically grabs the correct English checkpoints
         try:
-            self.model = whisperx.load_model(model_size, self.device, compute_type="float16" if self.device=="cuda" else "int8")
+            self.compute_type = self._initial_compute_type()
+            self.model = self._get_asr_model(model_size, self.device, self.compute_type)
             if self.debug:
                 print(f"DEBUG: whisperx.load_model() returned successfully!")
                 print(f"DEBUG: WhisperX model loaded successfully")
@@ -39,9 +91,9 @@ class WhisperXEngine:
             if self.device == "cuda":
                 print(f"DEBUG: Falling back to CPU")
                 self.device = "cpu"
-                self.dtype = torch.float32
+                self.compute_type = self._initial_compute_type()
                 try:
-                    self.model = whisperx.load_model(model_size, self.device, compute_type="int8")
+                    self.model = self._get_asr_model(model_size, self.device, self.compute_type)
                     if self.debug:
                         print(f"DEBUG: WhisperX model loaded successfully on CPU")
                 except Exception as cpu_error:
@@ -51,296 +103,615 @@ class WhisperXEngine:
                 raise e
 
     # ------------------------------------------------------------------
-    # Public API identical to old engine
+    # Models - looked up in the process-wide registry, loaded on a miss
     # ------------------------------------------------------------------
-    def transcribe_with_speakers(self, audio_path, speaker_names=None):
+    def _set_torch_threads(self, threads):
+        _torch().set_num_threads(threads)
+
+    def set_cpu_threads(self, threads):
         """
-        Returns list of segments with keys:
-        start, end (sec float), text, speaker  ― same shape as before.
+        Follow a new share of the host's cores (ThreadBudget.refresh). On CPU
+        the Whisper model is reloaded: CTranslate2 sizes its pool at load.
         """
+        if not threads or threads == self.cpu_threads:
+            return
         if self.debug:
-            print(f"DEBUG: Starting WhisperX transcription of: {audio_path}")
-        if self.progress_callback: self.progress_callback(30, "Transcribing audio...")
-        
-        # Use conservative batch size for Windows stability
-        batch_size = 4 if self.device == "cuda" else 2
+            print(f"DEBUG: CPU threads {self.cpu_threads} -> {threads}")
+        self.cpu_threads = threads
+        self._set_torch_threads(threads)
+        if self.device == "cpu":
+            self.model = self._get_asr_model(self.model_size, self.device, self.compute_type)
+
+    def _get_asr_model(self, model_size, device, compute_type):
+        # CTranslate2's CPU pool is sized once, at load (whisperx defaults to 4 threads),
+        # so the thread count is part of the key. num_workers stays at 1 on purpose:
+        # whisperx.load_model doesn't take it, and a job's batches run one call at a time
+        threads = self.cpu_threads if device == "cpu" else None
+        options = {"threads": threads} if threads else {}
+        return self.registry.get(
+            "asr", model_size, device=device, compute_type=compute_type, threads=threads,
+            loader=lambda: _whisperx().load_model(model_size, device, compute_type=compute_type, **options)
+        )
+
+    def _initial_compute_type(self):
+        """An explicit compute type, else float16 on GPU and the tuned (or int8) precision on CPU"""
+        if self.requested_compute_type not in (None, "auto"):
+            return self.requested_compute_type
+        if self.device == "cuda":
+            return "float16"
+        return ComputeTypeTuner(self.model_size).stored() or "int8"
+
+    def _get_align_model(self, language="en"):
+        def load():
+            model = _whisperx().load_align_model(language_code=language, device=self.device)
+            if self.debug:
+                print(f"DEBUG: Alignment model ({language}) loaded successfully")
+            return model
+        return self.registry.get("align", "wav2vec2", device=self.device, language=language, loader=load)
+
+    def _get_diarize_pipeline(self, fine_grained=True):
+        def load():
+            from pyannote.audio import Pipeline
+            # Load the pipeline and customize parameters for rapid speaker changes
+            pipeline = Pipeline.from_pretrained(
+                "pyannote/speaker-diarization-3.1",
+                use_auth_token=self.hf_token
+            ).to(_torch().device(self.device))
+            
+            if fine_grained:
+                # Configure for finer granularity - adjust VAD parameters
+                # These parameters make the system more sensitive to short utterances
+                pipeline._segmentation.model.specifications.min_duration_on = 0.1    # minimum speech duration (default: 0.5s)
+                pipeline._segmentation.model.specifications.min_duration_off = 0.1   # minimum silence duration (default: 0.5s)
+            return pipeline
+        name = "pyannote/speaker-diarization-3.1" + ("+fine-grained" if fine_grained else "")
+        return self.registry.get("diarize", name, device=self.device, loader=load)
+
+    def _get_whisperx_diarizer(self):
+        from whisperx.diarize import DiarizationPipeline
+        return self.registry.get(
+            "diarize", "whisperx.DiarizationPipeline", device=self.device,
+            loader=lambda: DiarizationPipeline(use_auth_token=self.hf_token, device=self.device)
+        )
+
+    def preload(self, diarize=False, language="en"):
+        """
+        Load the alignment (and optionally diarization) models ahead of the
+        first job, e.g. while the audio is still downloading. Failures are
+        left for transcribe_with_speakers to handle through its fallbacks.
+        """
+        if self.progress_callback:
+            self.progress_callback(20, "Preloading alignment/diarization models...")
+        try:
+            self._get_align_model(language)
+        except Exception as e:
+            print(f"DEBUG: Preloading alignment model failed: {e}")
+        if diarize:
+            try:
+                self._get_diarize_pipeline()
+                if self.debug:
+                    print(f"DEBUG: Diarization pipeline preloaded")
+            except Exception as e:
+                print(f"DEBUG: Preloading diarization pipeline failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Stage cache helpers (no-ops without a result store)
+    # ------------------------------------------------------------------
+    def _cache_get(self, digest, stage, params):
+        if self.result_store is None:
+            return None
+        data = self.result_store.get(digest, stage, params)
+        if data is not None and self.debug:
+            print(f"DEBUG: Reusing cached {stage} result")
+        return data
+
+    def _cache_put(self, digest, stage, params, data):
+        if self.result_store is not None:
+            self.result_store.put(digest, stage, params, data)
+
+    # ------------------------------------------------------------------
+    # Pipeline stages
+    # ------------------------------------------------------------------
+    def _tuner(self):
+        if self._batch_tuner is None:
+            self._batch_tuner = BatchSizeTuner(self.model_size, self.device, self.compute_type)
+        return self._batch_tuner
+
+    def _choose_batch_size(self, audio, requested=None):
+        """
+        requested: a number (used as is), "auto" (tune on this audio unless
+        this host/model is already tuned) or None (tuned size if stored,
+        else the conservative default)
+        """
+        if requested not in (None, "auto"):
+            return max(1, int(requested))
+        tuner = self._tuner()
+        if requested == "auto" and tuner.stored() is None:
+            if self.progress_callback:
+                self.progress_callback(30, "Tuning batch size (first run of this model on this machine)...")
+            log = (lambda line: print(f"DEBUG: Autotune {line}")) if self.debug else None
+            tuned = tuner.calibrate(lambda part, size: self.model.transcribe(part, batch_size=size), audio, log=log)
+            if self.debug:
+                print(f"DEBUG: Autotuned batch size: {tuned}")
+        return tuner.batch_size()
+
+    def _choose_compute_type(self, audio):
+        """With compute_type "auto" on CPU, time each precision once on this audio and keep the fastest"""
+        tuner = ComputeTypeTuner(self.model_size)
+        if self.device != "cpu" or self.requested_compute_type != "auto" or tuner.stored() is not None:
+            return
+        if self.progress_callback:
+            self.progress_callback(30, "Measuring CPU compute types (first run of this model on this machine)...")
+        best = tuner.calibrate(
+            lambda compute_type: self._get_asr_model(self.model_size, self.device, compute_type),
+            lambda model, part: model.transcribe(part, batch_size=self._tuner().batch_size()),
+            audio, log=(lambda line: print(f"DEBUG: Compute type {line}")) if self.debug else None)
+        if self.debug:
+            print(f"DEBUG: Fastest CPU compute type: {best}")
+        if best and best != self.compute_type:
+            self.compute_type = best
+            self.model = self._get_asr_model(self.model_size, self.device, best)
+            self._batch_tuner = None  # batch sizes are tuned per compute type
+        # Every candidate was loaded to be timed - keep only the one in use
+        for compute_type in CPU_COMPUTE_TYPES:
+            if compute_type != self.compute_type:
+                self.registry.drop("asr", self.model_size, device=self.device, compute_type=compute_type,
+                                   threads=self.cpu_threads)
+
+    def _asr(self, audio):
+        """self.model.transcribe with out-of-memory backoff: halve the batch size and retry"""
+        while True:
+            try:
+                return self.model.transcribe(audio, batch_size=self.batch_size)
+            except Exception as e:
+                if not is_out_of_memory(e) or self.batch_size <= 1:
+                    raise
+                failed = self.batch_size
+                self.batch_size = self._tuner().record_oom(failed)
+                print(f"DEBUG: Out of memory at batch_size={failed}, retrying with {self.batch_size}")
+                release_memory(self.device)
+
+    def _transcribe_sharded(self, audio, shards, batch_size, digest, asr_params):
+        """CPU only: transcribe overlapping shards in a process pool, checkpointing each shard"""
+        checkpoint_params = dict(asr_params or {}, shards=shards)
+        checkpoint = (self._cache_get(digest, "asr-checkpoint", checkpoint_params) if digest else None) or {}
+        done = {int(index): tuple(result) for index, result in checkpoint.get("done", {}).items()}
+        if done and self.debug:
+            print(f"DEBUG: Resuming sharded transcription - {len(done)}/{shards} shards done")
+
+        def on_shard_done(index, segments, language):
+            done[index] = (segments, language)
+            if digest:
+                self._cache_put(digest, "asr-checkpoint", checkpoint_params,
+                                {"done": {str(i): list(r) for i, r in done.items()}})
+            if self.debug:
+                print(f"DEBUG: Shard {index + 1}/{shards} done - {len(segments)} segments")
+
+        segments, language = transcribe_sharded(
+            audio, self.model_size, shards, batch_size=batch_size, compute_type=self.compute_type,
+            threads=self.cpu_threads,
+            done=done, on_shard_done=on_shard_done, progress_callback=self.progress_callback,
+            on_segments=self.segment_callback
+        )
+        if digest and self.result_store is not None:
+            self.result_store.delete(digest, "asr-checkpoint", checkpoint_params)
+        if self.debug:
+            print(f"DEBUG: Sharded transcription completed - {len(segments)} segments")
+        return {"segments": segments, "language": language}
+
+    def _transcribe(self, audio, digest=None, asr_params=None, shards=1, batch_size=None, window_seconds=None):
+        """
+        Raw Whisper pass -> {"segments": [...], "language": ...}
+        Long audio is cut at quiet points into windows of about
+        window_seconds. Each finished window is checkpointed in the result
+        store, so a crashed or timed-out job resumes at the next window.
+        On CPU with shards > 1 the windows run in parallel processes instead.
+        batch_size is a number, "auto" or None (see _choose_batch_size).
+        window_seconds overrides self.window_seconds (progressive mode).
+        """
+        window_seconds = self.window_seconds if window_seconds is None else window_seconds
+        self._choose_compute_type(audio)
+        self.batch_size = batch_size = self._choose_batch_size(audio, batch_size)
         if self.debug:
             print(f"DEBUG: Starting transcription with batch_size={batch_size}")
         
-        whisper_result = self.model.transcribe(audio_path, batch_size=batch_size)
+        # Sharding only pays off when every shard gets at least a minute of audio
+        if self.device == "cpu" and shards > 1 and duration_of(audio) >= shards * 60:
+            return self._transcribe_sharded(audio, shards, batch_size, digest, asr_params)
+
+        windows = [list(w) for w in plan_windows(audio, window_seconds)]
+        if len(windows) == 1:
+            whisper_result = self._asr(audio)
+            if self.debug:
+                print(f"DEBUG: Transcription completed - {len(whisper_result['segments'])} segments")
+            if self.segment_callback:
+                self.segment_callback(whisper_result["segments"])
+            return {"segments": whisper_result["segments"], "language": whisper_result.get("language", "en")}
+
+        checkpoint_params = dict(asr_params or {}, window_seconds=window_seconds)
+        checkpoint = None
+        if digest:
+            checkpoint = self._cache_get(digest, "asr-checkpoint", checkpoint_params)
+        if not checkpoint or checkpoint.get("windows") != windows:
+            checkpoint = {"windows": windows, "done": [], "language": None}
+        elif self.debug:
+            print(f"DEBUG: Resuming from checkpoint - {len(checkpoint['done'])}/{len(windows)} windows done")
+        if self.segment_callback and checkpoint["done"]:
+            self.segment_callback([seg for window_segments in checkpoint["done"] for seg in window_segments])
+
+        for index in range(len(checkpoint["done"]), len(windows)):
+            start, end = windows[index]
+            if self.progress_callback:
+                self.progress_callback(30 + int(30 * index / len(windows)),
+                                       f"Transcribing audio (part {index + 1}/{len(windows)})...")
+            window_result = self._asr(audio[start:end])
+            window_segments = _offset_segments(window_result["segments"], start / SAMPLE_RATE)
+            checkpoint["done"].append(window_segments)
+            if self.segment_callback:
+                self.segment_callback(window_segments)
+            checkpoint["language"] = checkpoint["language"] or window_result.get("language", "en")
+            if digest:
+                self._cache_put(digest, "asr-checkpoint", checkpoint_params, checkpoint)
+            if self.debug:
+                print(f"DEBUG: Window {index + 1}/{len(windows)} done - {len(window_segments)} segments")
+
+        segments = [seg for window_segments in checkpoint["done"] for seg in window_segments]
+        if digest and self.result_store is not None:
+            self.result_store.delete(digest, "asr-checkpoint", checkpoint_params)
         if self.debug:
-            print(f"DEBUG: Transcription completed - {len(whisper_result['segments'])} segments")
+            print(f"DEBUG: Transcription completed - {len(segments)} segments")
+        return {"segments": segments, "language": checkpoint["language"] or "en"}
 
-        if self.progress_callback: self.progress_callback(60, "Aligning & diarising...")
+    def _draft(self, audio, model_size, digest, draft_params):
+        """
+        Quick pass with a small model, published through draft_callback one
+        short window at a time. It is cached like any other ASR result of that
+        model, so it is only computed once per audio. Never fails the job.
+        """
+        cached = self._cache_get(digest, "asr", draft_params)
+        if cached is not None:
+            self.draft_callback(cached["segments"])
+            return
+        try:
+            model = self._get_asr_model(model_size, self.device, self.compute_type)
+            batch_size = BatchSizeTuner(model_size, self.device, self.compute_type).batch_size()
+            windows = plan_windows(audio, DRAFT_WINDOW_SECONDS)
+            segments, language = [], None
+            for index, (start, end) in enumerate(windows):
+                if self.progress_callback:
+                    self.progress_callback(30, f"Drafting with {model_size} model (part {index + 1}/{len(windows)})...")
+                window_result = model.transcribe(audio[start:end], batch_size=batch_size)
+                window_segments = _offset_segments(window_result["segments"], start / SAMPLE_RATE)
+                segments += window_segments
+                language = language or window_result.get("language")
+                self.draft_callback(window_segments)
+        except Exception as e:
+            print(f"DEBUG: Draft pass with {model_size} failed, continuing without it: {e}")
+            return
+        self._cache_put(digest, "asr", draft_params, {"segments": segments, "language": language or "en"})
 
-        # ── alignment to word-level ───────────────────────────────────
+    def _align(self, whisper_result, audio):
+        """Word-level alignment -> (result, aligned); falls back to the raw segments"""
+        language = whisper_result.get("language") or "en"
         if self.debug:
-            print(f"DEBUG: Starting word-level alignment...")
+            print(f"DEBUG: Starting word-level alignment ({language})...")
         
         try:
             # Get alignment model metadata
-            alignment_model, metadata = whisperx.load_align_model(language_code="en", device=self.device)
-            if self.debug:
-                print(f"DEBUG: Alignment model loaded successfully")
+            alignment_model, metadata = self._get_align_model(language)
             
-            whisper_result = whisperx.align(whisper_result["segments"],
-                                            alignment_model, metadata,
-                                            audio_path, self.device)
+            aligned = _whisperx().align(whisper_result["segments"],
+                                     alignment_model, metadata,
+                                     audio, self.device)
             if self.debug:
                 print(f"DEBUG: Word alignment completed")
+            return {"segments": aligned["segments"]}, True
         except Exception as align_error:
             print(f"DEBUG: Word alignment failed: {align_error}")
             # Continue without word-level alignment
             if self.debug:
                 print(f"DEBUG: Continuing without word-level alignment")
-            pass
+            return whisper_result, False
 
-        # Skip diarization if no speaker names provided (for faster testing)
-        if not speaker_names:
-            if self.debug:
-                print(f"DEBUG: No speaker names provided - skipping diarization")
-            segments = []
-            for seg in whisper_result["segments"]:
-                segments.append({
-                    "start": seg["start"],
-                    "end": seg["end"], 
-                    "text": seg["text"],
-                    "speaker": "Speaker"
-                })
-        else:
-            if self.debug:
-                print(f"DEBUG: Starting speaker diarization...")
-                print(f"DEBUG: Running whisperx.diarize() - first run may download ~1.8GB models...")
-            
-            # Try different diarization methods in order of preference
-            diarization_method = "none"
+    @staticmethod
+    def _to_turns(speaker_ts):
+        """Normalise any diarization output (pyannote Annotation or DataFrame) to [start, end, label] rows"""
+        if hasattr(speaker_ts, "itertracks"):
+            return [[float(turn.start), float(turn.end), label]
+                    for turn, _, label in speaker_ts.itertracks(yield_label=True)]
+        return [[float(start), float(end), label]
+                for start, end, label in zip(speaker_ts['start'], speaker_ts['end'], speaker_ts['speaker'])]
+
+    def _diarize(self, audio, speaker_names):
+        """Speaker diarization -> (turns or None, method name)"""
+        if self.debug:
+            print(f"DEBUG: Starting speaker diarization...")
+            print(f"DEBUG: Running whisperx.diarize() - first run may download ~1.8GB models...")
+        
+        # Try different diarization methods in order of preference
+        diarization_method = "none"
+        try:
+            # Method 1: Try custom fine-grained diarization for rapid speaker changes
             try:
-                # Method 1: Try custom fine-grained diarization for rapid speaker changes
+                if self.debug:
+                    print(f"DEBUG: Using custom fine-grained pyannote pipeline")
+                diarize_model = self._get_diarize_pipeline()
+                
+                # pyannote expects a (channel, time) tensor - wrap the shared buffer without copying
+                waveform = _torch().from_numpy(audio).unsqueeze(0)
+                
+                # Use min/max speakers if provided
+                if speaker_names and len(speaker_names) >= 2:
+                    speaker_ts = diarize_model({"waveform": waveform, "sample_rate": SAMPLE_RATE}, 
+                                             min_speakers=len(speaker_names), max_speakers=len(speaker_names))
+                else:
+                    speaker_ts = diarize_model({"waveform": waveform, "sample_rate": SAMPLE_RATE})
+                
+                diarization_method = "Custom Fine-Grained Pipeline"
+                if self.debug:
+                    turns = self._to_turns(speaker_ts)
+                    print(f"DEBUG: Fine-grained diarization created {len(turns)} segments")
+                    if turns:
+                        print(f"DEBUG: Average segment length: {sum(end - start for start, end, _ in turns) / len(turns):.2f}s")
+                
+            except Exception as fine_grained_error:
+                if self.debug:
+                    print(f"DEBUG: Fine-grained diarization failed: {fine_grained_error}")
+                
+                # Method 2: Fallback to standard WhisperX DiarizationPipeline
                 try:
-                    from pyannote.audio import Pipeline
                     if self.debug:
-                        print(f"DEBUG: Using custom fine-grained pyannote pipeline")
-                    
-                    # Load the pipeline and customize parameters for rapid speaker changes
-                    diarize_model = Pipeline.from_pretrained(
-                        "pyannote/speaker-diarization-3.1",
-                        use_auth_token=self.hf_token
-                    ).to(torch.device(self.device))
-                    
-                    # Configure for finer granularity - adjust VAD parameters
-                    # These parameters make the system more sensitive to short utterances
-                    diarize_model._segmentation.model.specifications.min_duration_on = 0.1    # minimum speech duration (default: 0.5s)
-                    diarize_model._segmentation.model.specifications.min_duration_off = 0.1   # minimum silence duration (default: 0.5s)
-                    
-                    # Load audio for diarization
-                    audio_for_diarization = whisperx.load_audio(audio_path)
-                    
+                        print(f"DEBUG: Using whisperx.diarize.DiarizationPipeline")
+                    diarize_model = self._get_whisperx_diarizer()
                     # Use min/max speakers if provided
                     if speaker_names and len(speaker_names) >= 2:
-                        speaker_ts = diarize_model({"waveform": audio_for_diarization, "sample_rate": 16000}, 
-                                                 min_speakers=len(speaker_names), max_speakers=len(speaker_names))
+                        speaker_ts = diarize_model(audio, min_speakers=len(speaker_names), max_speakers=len(speaker_names))
                     else:
-                        speaker_ts = diarize_model({"waveform": audio_for_diarization, "sample_rate": 16000})
-                    
-                    # Convert pyannote output to DataFrame format
-                    import pandas as pd
-                    diarize_df = pd.DataFrame(speaker_ts.itertracks(yield_label=True), columns=['segment', 'label', 'speaker'])
-                    diarize_df['start'] = diarize_df['segment'].apply(lambda x: x.start)
-                    diarize_df['end'] = diarize_df['segment'].apply(lambda x: x.end)
-                    speaker_ts = diarize_df
-                    
-                    diarization_method = "Custom Fine-Grained Pipeline"
+                        speaker_ts = diarize_model(audio)
+                    diarization_method = "WhisperX DiarizationPipeline"
                     if self.debug:
-                        print(f"DEBUG: Fine-grained diarization created {len(speaker_ts)} segments")
-                        print(f"DEBUG: Average segment length: {(speaker_ts['end'] - speaker_ts['start']).mean():.2f}s")
+                        print(f"DEBUG: Standard diarization created {len(speaker_ts)} segments")
                     
-                except Exception as fine_grained_error:
+                except ImportError:
+                    # Method 3: Final fallback to manual pyannote pipeline
                     if self.debug:
-                        print(f"DEBUG: Fine-grained diarization failed: {fine_grained_error}")
-                    
-                    # Method 2: Fallback to standard WhisperX DiarizationPipeline
-                    try:
-                        from whisperx.diarize import DiarizationPipeline
-                        if self.debug:
-                            print(f"DEBUG: Using whisperx.diarize.DiarizationPipeline")
-                        diarize_model = DiarizationPipeline(
-                            use_auth_token=self.hf_token,
-                            device=self.device
-                        )
-                        # Use min/max speakers if provided
-                        if speaker_names and len(speaker_names) >= 2:
-                            speaker_ts = diarize_model(audio_path, min_speakers=len(speaker_names), max_speakers=len(speaker_names))
-                        else:
-                            speaker_ts = diarize_model(audio_path)
-                        diarization_method = "WhisperX DiarizationPipeline"
-                        if self.debug:
-                            print(f"DEBUG: Standard diarization created {len(speaker_ts)} segments")
-                        
-                    except ImportError:
-                        # Method 3: Final fallback to manual pyannote pipeline
-                        if self.debug:
-                            print(f"DEBUG: Using manual pyannote pipeline fallback")
-                        from pyannote.audio import Pipeline
-                        diarize_model = Pipeline.from_pretrained(
-                            "pyannote/speaker-diarization-3.1",
-                            use_auth_token=self.hf_token
-                        ).to(torch.device(self.device))
-                        
-                        # Load audio for diarization
-                        audio_for_diarization = whisperx.load_audio(audio_path)
-                        speaker_ts = diarize_model({"waveform": audio_for_diarization, "sample_rate": 16000})
-                        diarization_method = "Manual pyannote Pipeline"
+                        print(f"DEBUG: Using manual pyannote pipeline fallback")
+                    diarize_model = self._get_diarize_pipeline(fine_grained=False)
                     
-            except Exception as diarize_error:
-                if self.debug:
-                    print(f"DEBUG: Diarization failed: {diarize_error}")
-                # Skip diarization and continue with generic Speaker labels
-                speaker_ts = None
-                diarization_method = "none (failed)"
+                    speaker_ts = diarize_model({"waveform": _torch().from_numpy(audio).unsqueeze(0),
+                                                "sample_rate": SAMPLE_RATE})
+                    diarization_method = "Manual pyannote Pipeline"
             
+            turns = self._to_turns(speaker_ts)
+                
+        except Exception as diarize_error:
             if self.debug:
-                print(f"DEBUG: Speaker diarization completed")
+                print(f"DEBUG: Diarization failed: {diarize_error}")
+            # Skip diarization and continue with generic Speaker labels
+            turns = None
+            diarization_method = "none (failed)"
+        
+        if self.debug:
+            print(f"DEBUG: Speaker diarization completed")
+        return turns, diarization_method
 
-            # ── merge word-timestamps + diarisation ───────────────────────
+    def _merge(self, aligned_result, turns, metrics):
+        """Assign speakers to words/segments and split long multi-speaker segments"""
+        # ── merge word-timestamps + diarisation ───────────────────────
+        if self.debug:
+            print(f"DEBUG: Merging transcription with speaker labels...")
+        
+        if turns is None:
+            # No diarization, use generic speaker labels
+            return aligned_result["segments"]
+
+        try:
+            # Largest-overlap speaker for every segment and word, via sorted turn arrays
+            with metrics.stage("merge"):
+                final_segments = assign_speakers(aligned_result["segments"], turns)
+            
+            # Split at real speaker changes (and pauses in long segments) using word timestamps
             if self.debug:
-                print(f"DEBUG: Merging transcription with speaker labels...")
+                print(f"DEBUG: Post-processing segments for rapid speaker changes")
+            with metrics.stage("post_process"):
+                processed_segments = split_segments(final_segments)
             
-            if speaker_ts is not None:
-                try:
-                    transcript_with_speakers = whisperx.assign_word_speakers(
-                        diarize_df=speaker_ts,
-                        transcript_result=whisper_result
-                    )
-                    # assign_word_speakers returns the full transcript result, extract segments
-                    final_segments = transcript_with_speakers["segments"]
-                    
-                    # Post-process to split long segments with rapid speaker changes
-                    if self.debug:
-                        print(f"DEBUG: Post-processing long segments for rapid speaker changes")
-                    
-                    # Split segments longer than 30 seconds that likely contain multiple speakers
-                    processed_segments = []
-                    for seg in final_segments:
-                        segment_duration = seg["end"] - seg["start"]
-                        if segment_duration > 30.0:  # Long segment likely contains multiple speakers
-                            if self.debug:
-                                print(f"DEBUG: Splitting long segment ({segment_duration:.1f}s)")
-                            
-                            # Simple heuristic: split at natural pause indicators in text
-                            text = seg.get("text", "")
-                            split_indicators = ["? ", ". ", "! ", " really? ", " what? ", " no ", " yeah ", " okay "]
-                            
-                            # Find potential split points
-                            split_points = []
-                            for indicator in split_indicators:
-                                pos = text.find(indicator)
-                                while pos != -1:
-                                    split_points.append(pos + len(indicator))
-                                    pos = text.find(indicator, pos + 1)
-                            
-                            split_points = sorted(set(split_points))
-                            
-                            if len(split_points) > 2:  # Only split if we have multiple potential points
-                                # Create sub-segments
-                                prev_pos = 0
-                                current_speaker_index = 0
-                                speakers_to_use = speaker_names if speaker_names and len(speaker_names) >= 2 else [seg["speaker"], "Speaker_B"]
-                                
-                                for i, split_pos in enumerate(split_points[::2]):  # Take every other split point
-                                    if i > 3:  # Limit to avoid too many tiny segments
-                                        break
-                                    
-                                    sub_text = text[prev_pos:split_pos].strip()
-                                    if len(sub_text) > 10:  # Only create segment if substantial text
-                                        sub_duration = segment_duration * (split_pos - prev_pos) / len(text)
-                                        sub_start = seg["start"] + (segment_duration * prev_pos / len(text))
-                                        sub_end = min(seg["end"], sub_start + sub_duration)
-                                        
-                                        processed_segments.append({
-                                            "start": sub_start,
-                                            "end": sub_end,
-                                            "text": sub_text,
-                                            "speaker": speakers_to_use[current_speaker_index % len(speakers_to_use)]
-                                        })
-                                        
-                                        prev_pos = split_pos
-                                        current_speaker_index += 1
-                                
-                                # Add remaining text as final segment
-                                if prev_pos < len(text):
-                                    remaining_text = text[prev_pos:].strip()
-                                    if len(remaining_text) > 10:
-                                        processed_segments.append({
-                                            "start": seg["start"] + (segment_duration * prev_pos / len(text)),
-                                            "end": seg["end"],
-                                            "text": remaining_text,
-                                            "speaker": speakers_to_use[current_speaker_index % len(speakers_to_use)]
-                                        })
-                            else:
-                                processed_segments.append(seg)
-                        else:
-                            processed_segments.append(seg)
-                    
-                    final_segments = processed_segments
-                    
-                    # Map generic speaker labels to provided names
-                    if speaker_names and len(speaker_names) >= 2:
-                        if self.debug:
-                            print(f"DEBUG: Mapping speakers to provided names: {speaker_names}")
-                        
-                        # Create speaker mapping based on first appearance
-                        speaker_mapping = {}
-                        speaker_index = 0
-                        
-                        for seg in final_segments:
-                            if "speaker" in seg and seg["speaker"] not in speaker_mapping:
-                                if speaker_index < len(speaker_names):
-                                    speaker_mapping[seg["speaker"]] = speaker_names[speaker_index]
-                                    speaker_index += 1
-                                else:
-                                    speaker_mapping[seg["speaker"]] = f"Speaker_{speaker_index + 1}"
-                                    speaker_index += 1
-                        
-                        # Apply the mapping
-                        for seg in final_segments:
-                            if "speaker" in seg and seg["speaker"] in speaker_mapping:
-                                seg["speaker"] = speaker_mapping[seg["speaker"]]
-                                
-                        if self.debug:
-                            print(f"DEBUG: Speaker mapping applied: {speaker_mapping}")
-                            print(f"DEBUG: Post-processing created {len(final_segments)} total segments")
-                    
-                except Exception as assign_error:
-                    if self.debug:
-                        print(f"DEBUG: assign_word_speakers failed: {assign_error}")
-                    # Fall back to no diarization
-                    final_segments = whisper_result["segments"]
-            else:
-                # No diarization, use generic speaker labels
-                final_segments = whisper_result["segments"]
-
-            # Re-shape to match your old OutputFormatter expectations
             if self.debug:
-                print(f"DEBUG: final_segments type: {type(final_segments)}")
-                print(f"DEBUG: final_segments content: {final_segments}")
+                print(f"DEBUG: Post-processing created {len(processed_segments)} total segments")
+            return processed_segments
             
-            segments = []
-            for seg in final_segments:
-                segments.append({
-                    "start": seg["start"],
-                    "end"  : seg["end"],
-                    "text" : seg["text"],
-                    "speaker": seg.get("speaker", "Speaker")
-                })
-
-            # Optional: replace generic IDs with user-provided names
-            if speaker_names:
+        except Exception as assign_error:
+            if self.debug:
+                print(f"DEBUG: Speaker assignment failed: {assign_error}")
+            # Fall back to no diarization
+            return aligned_result["segments"]
+
+    # ------------------------------------------------------------------
+    # Public API identical to old engine
+    # ------------------------------------------------------------------
+    def transcribe_with_speakers(self, audio_path, speaker_names=None, pcm_cache_dir=None, shards=1,
+                                 metrics=None, batch_size=None, vad=False, draft_model=None):
+        """
+        Returns a Transcript whose segments have keys:
+        start, end (sec float), text, speaker  ― same shape as before,
+        plus the aligned words of each segment.
+        The audio is decoded once and the same 16 kHz buffer is shared by
+        transcription, alignment and diarization. With pcm_cache_dir set the
+        buffer is a memory-mapped .pcm file that later runs can reuse.
+        With a result store, each stage's output is cached by audio hash and
+        stage parameters, so only stages whose inputs changed are re-run.
+        shards > 1 splits CPU transcription across that many processes.
+        batch_size: ASR batch size, "auto" to tune it for this host, or None
+        for the stored tuned size (falling back to a conservative default).
+        vad=True runs a voice-activity pre-pass: transcription, alignment and
+        diarization only see the speech regions, and their timestamps are
+        mapped back onto the original timeline before the merge.
+        draft_model ("tiny"/"base", progressive mode): before a transcription
+        that isn't cached, that model drafts the audio first and its segments
+        go to draft_callback; the real pass then refines in short windows,
+        each one reported to segment_callback as it finishes.
+        Per-stage timings are recorded in metrics (a StageMetrics, created if
+        not given) and kept as self.last_metrics.
+        """
+        if self.debug:
+            print(f"DEBUG: Starting WhisperX transcription of: {audio_path}")
+        metrics = metrics if metrics is not None else StageMetrics()
+        self.last_metrics = metrics
+        with metrics.stage("decode"):  # hashing the input counts as reading it
+            digest = file_digest(audio_path)
+        num_speakers = len(speaker_names) if speaker_names else 0
+
+        # ── decode once (and only if some stage actually needs audio) ──
+        full_audio = None
+        audio = None
+        speech = None
+        def get_full_audio():
+            nonlocal full_audio
+            if full_audio is None:
+                with metrics.stage("decode"):
+                    full_audio = load_pcm(audio_path, cache_dir=pcm_cache_dir or os.getenv("SCRIPTOTIC_PCM_CACHE"),
+                                          digest=digest)
+                metrics.audio_seconds = duration_of(full_audio)
                 if self.debug:
-                    print(f"DEBUG: Mapping speakers to provided names...")
-                mapping = { f"SPEAKER_{i:02d}": name
-                            for i, name in enumerate(speaker_names) }
-                for s in segments:
-                    s["speaker"] = mapping.get(s["speaker"], s["speaker"])
+                    print(f"DEBUG: Decoded {duration_of(full_audio):.1f}s of audio at {SAMPLE_RATE} Hz")
+            return full_audio
+
+        def get_audio():
+            # With the VAD pre-pass every stage works on the packed speech only
+            nonlocal audio
+            if audio is None:
+                audio = speech.compact(get_full_audio()) if speech is not None else get_full_audio()
+            return audio
+
+        # ── VAD pre-pass: index the speech regions once ───────────────
+        stage_params = {}
+        if vad:
+            vad_params = {"version": VAD_VERSION}
+            index = self._cache_get(digest, "vad", vad_params)
+            if index is not None:
+                speech = SpeechIndex.from_dict(index)
+                metrics.record("vad", 0.0, cached=True)
+            else:
+                full = get_full_audio()
+                with metrics.stage("vad"):
+                    speech = SpeechIndex.detect(full)
+                self._cache_put(digest, "vad", vad_params, speech.to_dict())
+            if self.debug:
+                print(f"DEBUG: VAD kept {speech.speech_seconds():.1f}s of speech "
+                      f"({speech.coverage():.0%}) in {len(speech)} regions")
+            if not len(speech):
+                speech = None  # nothing detected - don't trust it, transcribe everything
+            else:
+                stage_params = {"vad": VAD_VERSION}  # results on packed audio are cached separately
+
+        callbacks = (self.segment_callback, self.draft_callback)
+        if speech is not None:
+            # Partial and draft segments are published on the original timeline
+            self.segment_callback, self.draft_callback = [
+                (lambda segments, callback=callback: callback(speech.map_segments(segments))) if callback else None
+                for callback in callbacks]
+
+        if self.progress_callback: self.progress_callback(30, "Transcribing audio...")
+        asr_params = dict(stage_params, model=self.model_size)
+        try:
+            whisper_result = self._cache_get(digest, "asr", asr_params)
+            if whisper_result is None:
+                audio = get_audio()
+                window_seconds = None
+                if self.draft_callback and use_draft(self.model_size, draft_model):
+                    with metrics.stage("draft"):
+                        self._draft(audio, draft_model, digest, dict(stage_params, model=draft_model))
+                    if self.window_seconds:
+                        window_seconds = min(self.window_seconds, REFINE_WINDOW_SECONDS)
+                with metrics.stage("transcribe"):
+                    whisper_result = self._transcribe(audio, digest, asr_params, shards=shards,
+                                                      batch_size=batch_size, window_seconds=window_seconds)
+                self._cache_put(digest, "asr", asr_params, whisper_result)
+            else:
+                metrics.record("transcribe", 0.0, cached=True)
+                if self.segment_callback:
+                    self.segment_callback(whisper_result["segments"])
+        finally:
+            self.segment_callback, self.draft_callback = callbacks
+
+        if self.progress_callback: self.progress_callback(60, "Aligning & diarising...")
+
+        diarize_params = dict(stage_params, speakers=num_speakers if num_speakers >= 2 else None)
+        diarization = self._cache_get(digest, "diarize", diarize_params) if speaker_names else None
+
+        # ── alignment and diarization run concurrently ────────────────
+        # Diarization only needs the audio, so it runs on a helper thread
+        # while this thread aligns words; both join before the merge.
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="diarize") as executor:
+            diarize_future = None
+            if speaker_names and diarization is None:
+                def timed_diarize(audio):
+                    with metrics.stage("diarize"):
+                        return self._diarize(audio, speaker_names)
+                diarize_future = executor.submit(timed_diarize, get_audio())
+            elif diarization is not None:
+                metrics.record("diarize", 0.0, cached=True)
+
+            # ── alignment to word-level ───────────────────────────────
+            align_params = dict(stage_params, model=self.model_size, language=whisper_result.get("language") or "en")
+            aligned_result = self._cache_get(digest, "align", align_params)
+            if aligned_result is None:
+                audio = get_audio()
+                with metrics.stage("align"):
+                    aligned_result, aligned = self._align(whisper_result, audio)
+                if aligned:
+                    self._cache_put(digest, "align", align_params, aligned_result)
+            else:
+                metrics.record("align", 0.0, cached=True)
+
+            if diarize_future is not None:
+                turns, diarization_method = diarize_future.result()
+                if turns is not None:
+                    self._cache_put(digest, "diarize", diarize_params,
+                                    {"turns": turns, "method": diarization_method})
+            elif diarization is not None:
+                turns, diarization_method = diarization["turns"], diarization["method"]
+
+        if speech is not None:
+            # Back from packed speech time to the original timeline
+            aligned_result = speech.map_result(aligned_result)
+            if speaker_names and turns:
+                turns = speech.map_turns(turns)
+
+        # Skip diarization if no speaker names provided (for faster testing)
+        if not speaker_names:
+            if self.debug:
+                print(f"DEBUG: No speaker names provided - skipping diarization")
+            diarization_method = "none"
+            final_segments = aligned_result["segments"]
+        else:
+            final_segments = self._merge(aligned_result, turns, metrics)
+
+        # Pack segments and aligned words into one array-backed Transcript;
+        # it reads like a list of segment dicts for OutputFormatter
+        if self.debug:
+            print(f"DEBUG: final_segments type: {type(final_segments)}")
+            print(f"DEBUG: final_segments content: {final_segments}")
+        
+        with metrics.stage("post_process"):
+            transcript = Transcript.from_segments(final_segments, default_speaker=GENERIC_SPEAKER)
+
+        # Keep the merged transcript with diarization labels so render/relabel
+        # can rebuild any output format or speaker mapping without the models
+        self._cache_put(digest, "final", dict(stage_params, model=self.model_size, speakers=num_speakers), {
+            "transcript": transcript.to_dict(),
+            "diarization_method": diarization_method,
+            "model": self.model_size,
+            "speaker_names": speaker_names
+        })
+        if self.result_store is not None:
+            self.result_store.prune()
+
+        # Replace generic IDs with user-provided names
+        if speaker_names and self.debug:
+            print(f"DEBUG: Mapping speakers to provided names: {speaker_names}")
+        with metrics.stage("post_process"):
+            segments = apply_speaker_names(transcript, speaker_names)
 
         if self.progress_callback: self.progress_callback(90, "Formatting output...")
         if self.debug:
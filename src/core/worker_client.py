@@ -0,0 +1,245 @@
+"""
+Client for the warm transcription worker.
+Starts src/workers/transcribe_worker.py in --serve mode and sends it jobs
+over stdin as JSON lines. The worker keeps its models loaded between jobs,
+but still runs in its own process so a crash there can't take down the
+GUI/CLI - the client just starts a fresh worker and retries.
+"""
+
+import os
+import sys
+import json
+import queue
+import itertools
+import threading
+import subprocess
+from collections import deque
+
+try:
+    from src.core.transcript import Transcript
+except ImportError:
+    from transcript import Transcript
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+WORKER_PATH = os.path.join(PROJECT_ROOT, 'src', 'workers', 'transcribe_worker.py')
+
+
+class WorkerCrashed(Exception):
+    """The worker process died or stopped answering while running a job"""
+
+
+class TranscriptionWorker:
+    """Long-lived transcription worker subprocess with automatic restarts"""
+
+    def __init__(self, timeout=1800, max_retries=1, startup_timeout=300, worker_args=None):
+        self.timeout = timeout
+        self.worker_args = list(worker_args or [])  # extra transcribe_worker.py flags
+        self.max_retries = max_retries
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._lines = None
+        self._stderr_tail = deque(maxlen=200)
+        self._stderr_thread = None
+        self._ids = itertools.count(1)
+        self._load_metrics = None  # metrics of the last preload, reported with the job that follows it
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Process management
+    # ------------------------------------------------------------------
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def start(self):
+        """Start the worker process if it isn't already running"""
+        if self.is_alive():
+            return
+        self._stderr_tail.clear()
+        self._lines = queue.Queue()
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_PATH, '--serve'] + self.worker_args,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding='utf-8', errors='replace', bufsize=1,
+            cwd=PROJECT_ROOT
+        )
+        threading.Thread(target=self._read_stdout, args=(self.process, self._lines), daemon=True).start()
+        self._stderr_thread = threading.Thread(target=self._read_stderr, args=(self.process,), daemon=True)
+        self._stderr_thread.start()
+
+        hello = self._next_message(self.startup_timeout)
+        if not hello.get("ready"):
+            raise WorkerCrashed(f"Unexpected worker greeting: {hello}")
+
+    def stop(self):
+        """Ask the worker to exit, killing it if it doesn't"""
+        with self._lock:
+            if not self.is_alive():
+                self.process = None
+                return
+            try:
+                self.process.stdin.write(json.dumps({"cmd": "shutdown"}) + "\n")
+                self.process.stdin.flush()
+                self.process.wait(timeout=10)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def kill(self):
+        if self.process is not None:
+            if self.process.poll() is None:
+                self.process.kill()
+            self.process.wait()
+        self.process = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @staticmethod
+    def _read_stdout(process, lines):
+        for line in process.stdout:
+            lines.put(line)
+        lines.put(None)  # EOF - the worker exited
+
+    def _read_stderr(self, process):
+        # Drain stderr so the worker never blocks on a full pipe
+        for line in process.stderr:
+            self._stderr_tail.append(line.rstrip('\n'))
+
+    def stderr_tail(self):
+        if self._stderr_thread is not None and not self.is_alive():
+            self._stderr_thread.join(timeout=2)
+        return '\n'.join(self._stderr_tail)
+
+    def _next_message(self, timeout):
+        """Return the next JSON message from the worker, skipping non-JSON output"""
+        while True:
+            try:
+                line = self._lines.get(timeout=timeout)
+            except queue.Empty:
+                self.kill()
+                raise WorkerCrashed(f"Worker did not respond within {timeout}s")
+            if line is None:
+                code = self.process.wait() if self.process else None
+                raise WorkerCrashed(f"Worker exited unexpectedly (exit code {code})")
+            line = line.strip()
+            if line.startswith('{') and line.endswith('}'):
+                try:
+                    return json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+    def _send(self, message):
+        self.process.stdin.write(json.dumps(message) + "\n")
+        self.process.stdin.flush()
+
+    # Messages the worker streams while a job runs; anything else ends the job
+    EVENTS = ("progress", "segments", "draft")
+
+    def _run_job(self, job, on_event=None):
+        self.start()
+        try:
+            self._send(job)
+        except OSError as e:
+            raise WorkerCrashed(f"Could not send job to worker: {e}")
+        while True:
+            # The timeout applies per message, so a job that keeps reporting never times out
+            message = self._next_message(self.timeout)
+            if message.get("id") != job["id"]:
+                if message.get("loaded"):
+                    # A preload() answering; its load time belongs to this job
+                    self._load_metrics = message.get("metrics")
+                continue
+            if message.get("event") in self.EVENTS:
+                if on_event:
+                    on_event(message)
+                continue
+            return message
+
+    def preload(self, model_size, hf_token=None, diarize=False, compute_type=None):
+        """
+        Start the worker and have it load its models in the background.
+        Returns immediately so the caller can download audio meanwhile; the
+        next transcribe() call simply queues behind the load.
+        """
+        def _send_load():
+            with self._lock:
+                try:
+                    self.start()
+                    self._send({
+                        "id": next(self._ids),
+                        "cmd": "load",
+                        "model": model_size,
+                        "hf_token": hf_token or "",
+                        "diarize": diarize,
+                        "compute_type": compute_type
+                    })
+                except (WorkerCrashed, OSError):
+                    # transcribe() restarts the worker if it didn't come up
+                    self.kill()
+
+        thread = threading.Thread(target=_send_load, daemon=True)
+        thread.start()
+        return thread
+
+    def transcribe(self, audio_file, model_size, speaker_names=None, hf_token=None, pcm_cache_dir=None,
+                   shards=1, on_event=None, batch_size=None, compute_type=None, vad=False, draft_model=None):
+        """
+        Run one transcription job, restarting the worker if it crashes.
+        on_event(message) is called on this thread for every event the job
+        streams: {"event": "progress", "percent", "message"} and
+        {"event": "segments", "segments": [{start, end, text}, ...]} with
+        draft (not yet aligned or diarized) segments in order. With
+        draft_model ("tiny"/"base") a quick {"event": "draft", "segments"}
+        pass comes first and the "segments" events then replace it window by
+        window (progressive.DraftView merges the two).
+        """
+        with self._lock:
+            job = {
+                "id": next(self._ids),
+                "cmd": "transcribe",
+                "audio_file": os.path.abspath(audio_file),
+                "model": model_size,
+                "speakers": speaker_names,
+                "hf_token": hf_token or "",
+                "pcm_cache": os.path.abspath(pcm_cache_dir) if pcm_cache_dir else None,
+                "shards": shards,
+                "batch_size": batch_size,
+                "compute_type": compute_type,
+                "vad": vad,
+                "draft_model": draft_model
+            }
+
+            attempt = 0
+            while True:
+                try:
+                    result = self._run_job(job, on_event)
+                    break
+                except WorkerCrashed as crash:
+                    attempt += 1
+                    self.kill()
+                    stderr = self.stderr_tail()
+                    if attempt > self.max_retries:
+                        error_msg = f"Transcription worker crashed: {crash}\n"
+                        if stderr:
+                            error_msg += f"STDERR:\n{stderr}\n"
+                        raise Exception(error_msg)
+
+            if result.get("fatal"):
+                # The worker exits after a fatal error; make sure the next job gets a fresh one
+                self.kill()
+
+            if not result.get("success"):
+                raise Exception(f"Transcription failed: {result.get('error', 'Unknown error')}")
+            # The model was loaded by preload() while the audio downloaded
+            result["load_metrics"], self._load_metrics = self._load_metrics, None
+            # Callers read result["segments"]; it is a Transcript, which indexes like a list of dicts
+            result["segments"] = Transcript.from_dict(result.pop("transcript"))
+            return result
@@ -0,0 +1,75 @@
+"""
+Per-job work directories under ~/.scriptotic/jobs.
+Every transcription job gets its own uniquely named directory, so jobs
+running side by side in the same folder (or on the same host) never share
+a file. Downloads are written straight into the workspace; audio that
+already lives elsewhere (the audio cache) is hardlinked in rather than
+copied. The cache lives on the same drive, so the link is free and the job
+keeps its file even if the cache evicts the entry meanwhile.
+"""
+
+import os
+import time
+import shutil
+import tempfile
+from pathlib import Path
+
+STALE_HOURS = 24
+
+
+def default_root():
+    return os.getenv("SCRIPTOTIC_WORK_DIR") or str(Path.home() / ".scriptotic" / "jobs")
+
+
+def prune_stale(root=None, max_age_hours=STALE_HOURS):
+    """Remove workspaces left behind by jobs that crashed or were killed"""
+    root = root or default_root()
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_hours * 3600
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if name.startswith("job-") and os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            pass
+
+
+class JobWorkspace:
+    """A private directory for one job's files, removed with everything in it on close()"""
+
+    def __init__(self, root=None):
+        root = root or default_root()
+        os.makedirs(root, exist_ok=True)
+        prune_stale(root)
+        self.path = tempfile.mkdtemp(prefix="job-", dir=root)
+
+    def file(self, name):
+        """Path for a file inside the workspace"""
+        return os.path.join(self.path, name)
+
+    def adopt(self, path, name="audio"):
+        """
+        Make path available inside the workspace without copying it:
+        files already in the workspace are used as they are, others are
+        hardlinked. Only if the filesystem can't link is the file copied.
+        """
+        path = os.path.abspath(path)
+        if os.path.dirname(path) == os.path.abspath(self.path):
+            return path
+        target = self.file(name + os.path.splitext(path)[1])
+        try:
+            os.link(path, target)
+        except OSError:
+            shutil.copy2(path, target)
+        return target
+
+    def close(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
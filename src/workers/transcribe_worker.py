@@ -8,6 +8,7 @@ import os
 import sys
 import json
 import argparse
+import threading
 
 # Fix sys.path for proper imports when running as subprocess
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -34,34 +35,80 @@ if sys.platform == "win32":
         else:
             print(f"DEBUG: DLL directory not found: {p}", file=sys.stderr)
 
-# Import only what we absolutely need
+# Import only what we absolutely need. The engine (whisperx, torch) is
+# imported when the first job needs a model, so the worker is ready at once
 try:
-    from src.core.whisperx_engine import WhisperXEngine
+    from src.core.result_store import ResultStore
+    from src.core.metrics import StageMetrics
+    from src.core.thread_budget import ThreadBudget
 except ImportError:
     sys.path.append('src/core')
-    from whisperx_engine import WhisperXEngine
+    from result_store import ResultStore
+    from metrics import StageMetrics
+    from thread_budget import ThreadBudget
 
-# Debug: Check what whisperx module we're getting
-import whisperx
-print(f"DEBUG: whisperx module location: {whisperx.__file__}", file=sys.stderr)
-print(f"DEBUG: whisperx.diarize exists: {hasattr(whisperx, 'diarize')}", file=sys.stderr)
 
-# Check if DiarizationPipeline can be imported
-try:
-    from whisperx.diarize import DiarizationPipeline
-    print(f"DEBUG: whisperx.diarize.DiarizationPipeline import: SUCCESS", file=sys.stderr)
-except ImportError as e:
-    print(f"DEBUG: whisperx.diarize.DiarizationPipeline import: FAILED - {e}", file=sys.stderr)
+def _whisperx_engine():
+    """Import WhisperXEngine (and with it whisperx and torch) on first use"""
+    try:
+        from src.core.whisperx_engine import WhisperXEngine
+    except ImportError:
+        from whisperx_engine import WhisperXEngine
 
-def main():
-    parser = argparse.ArgumentParser(description='Isolated WhisperX transcription worker')
-    parser.add_argument('audio_file', help='Path to audio file')
-    parser.add_argument('--model', default='base', choices=['tiny', 'base', 'small', 'medium', 'large'])
-    parser.add_argument('--speakers', help='Speaker names (comma-separated)')
-    parser.add_argument('--hf-token', help='HuggingFace token')
-    
-    args = parser.parse_args()
-    
+    # Debug: Check what whisperx module we're getting
+    import whisperx
+    print(f"DEBUG: whisperx module location: {whisperx.__file__}", file=sys.stderr)
+    print(f"DEBUG: whisperx.diarize exists: {hasattr(whisperx, 'diarize')}", file=sys.stderr)
+    return WhisperXEngine
+
+
+def _parse_speakers(speakers):
+    """Accept either a comma-separated string or a list of names"""
+    if not speakers:
+        return None
+    if isinstance(speakers, str):
+        speakers = speakers.split(',')
+    return [s.strip() for s in speakers if s.strip()]
+
+
+def _is_fatal(error):
+    """Errors that leave the process in a state we should not keep serving from"""
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error)
+    return "CUDA" in message or "cuDNN" in message or "out of memory" in message
+
+
+def _segments_event(job_id, event, segments):
+    return {"id": job_id, "event": event,
+            "segments": [{"start": seg["start"], "end": seg["end"], "text": seg["text"]} for seg in segments]}
+
+
+def _attach_events(engine, send, job_id):
+    """Forward the engine's progress, partial and draft segments as JSON-lines events"""
+    engine.progress_callback = lambda percent, message: send(
+        {"id": job_id, "event": "progress", "percent": percent, "message": message})
+    engine.segment_callback = lambda segments: send(_segments_event(job_id, "segments", segments))
+    engine.draft_callback = lambda segments: send(_segments_event(job_id, "draft", segments))
+
+
+def _detach_events(engine):
+    engine.progress_callback = None
+    engine.segment_callback = None
+    engine.draft_callback = None
+
+
+def _engine_class(spec):
+    """Engine class from --engine module:Class (e.g. the benchmark stubs); WhisperXEngine by default"""
+    if not spec:
+        return _whisperx_engine()
+    import importlib
+    module_name, _, class_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), class_name or "WhisperXEngine")
+
+
+def run_once(args, budget):
+    """Original one-shot mode: transcribe a single file and exit"""
     # Debug: Print environment info to stderr
     print(f"DEBUG: Current working directory: {os.getcwd()}", file=sys.stderr)
     print(f"DEBUG: sys.path: {sys.path[:3]}...", file=sys.stderr)
@@ -70,20 +117,32 @@ def main():
     
     try:
         # Parse speaker names
-        speaker_names = None
-        if args.speakers:
-            speaker_names = [s.strip() for s in args.speakers.split(',')]
+        speaker_names = _parse_speakers(args.speakers)
         
         # Initialize engine in clean environment
-        engine = WhisperXEngine(
-            model_size=args.model,
-            hf_token=args.hf_token or os.getenv("HUGGINGFACE_TOKEN")
-        )
+        metrics = StageMetrics()
+        with metrics.stage("model_load"):
+            engine = _engine_class(args.engine)(
+                model_size=args.model,
+                hf_token=args.hf_token or os.getenv("HUGGINGFACE_TOKEN"),
+                result_store=None if args.no_result_cache else ResultStore(),
+                window_seconds=args.window_seconds,
+                compute_type=args.compute_type,
+                cpu_threads=budget.threads
+            )
+        
+        # Events go to stdout as JSON lines ahead of the final result
+        def send(message):
+            print(json.dumps(message), file=sys.stdout, flush=True)
+        _attach_events(engine, send, None)
         
         # Perform transcription with memory management
         try:
             print(f"DEBUG: Starting transcription of {args.audio_file}", file=sys.stderr)
-            segments, diarization_method = engine.transcribe_with_speakers(args.audio_file, speaker_names=speaker_names)
+            transcript, diarization_method = engine.transcribe_with_speakers(
+                args.audio_file, speaker_names=speaker_names, pcm_cache_dir=args.pcm_cache,
+                shards=args.shards, metrics=metrics, batch_size=args.batch_size, vad=args.vad,
+                draft_model=args.draft_model)
             print(f"DEBUG: Transcription completed successfully", file=sys.stderr)
         except Exception as transcribe_error:
             print(f"DEBUG: Transcription failed with error: {transcribe_error}", file=sys.stderr)
@@ -95,20 +154,25 @@ def main():
         
         # Output result as JSON to stdout (use stderr for debug output)
         result = {
+            "event": "result",
             "success": True,
             "model": args.model,
+            "device": engine.device,
             "diarization_method": diarization_method,
-            "segments": segments,
-            "segment_count": len(segments)
+            "transcript": transcript.to_dict(),
+            "segment_count": len(transcript),
+            "metrics": metrics.as_dict()
         }
         
         # Only print JSON to stdout, everything else goes to stderr
+        metrics.log(sys.stderr)
         print(json.dumps(result), file=sys.stdout)
-        print(f"SUCCESS: Transcribed {len(segments)} segments", file=sys.stderr)
+        print(f"SUCCESS: Transcribed {len(transcript)} segments", file=sys.stderr)
         
     except Exception as e:
         # Output error as JSON to stdout
         error_result = {
+            "event": "result",
             "success": False,
             "error": str(e),
             "error_type": type(e).__name__
@@ -117,5 +181,188 @@ def main():
         print(f"ERROR: {e}", file=sys.stderr)
         sys.exit(1)
 
+
+class WorkerServer:
+    """
+    Warm worker: keeps a WhisperXEngine resident and handles jobs sent as
+    JSON lines on stdin. While a job runs it streams "progress", "segments"
+    and (progressive jobs) "draft" events on stdout, then answers with one
+    "result" line.
+    """
+
+    def __init__(self, out, result_store=None, window_seconds=600, engine_spec=None, budget=None):
+        self.out = out
+        self.budget = budget  # ThreadBudget: this worker's share of the host's cores
+        self.engine_spec = engine_spec  # resolved by the first job, so startup doesn't import whisperx
+        self.engine_class = None
+        self.result_store = result_store
+        self.window_seconds = window_seconds
+        self.engine = None
+        self.engine_key = None
+        self._out_lock = threading.Lock()
+
+    def _send(self, message):
+        line = json.dumps(message) + "\n"
+        with self._out_lock:
+            self.out.write(line)
+            self.out.flush()
+
+    def _get_engine(self, model_size, hf_token, compute_type=None):
+        key = (model_size, hf_token, compute_type)
+        if self.engine_key != key:
+            # Only one engine stays resident - drop the old one before loading
+            self.engine = None
+            self.engine_key = None
+            import gc
+            gc.collect()
+            print(f"DEBUG: Loading engine for model {model_size}", file=sys.stderr)
+            if self.engine_class is None:
+                self.engine_class = _engine_class(self.engine_spec)
+            self.engine = self.engine_class(model_size=model_size, hf_token=hf_token,
+                                            result_store=self.result_store,
+                                            window_seconds=self.window_seconds,
+                                            compute_type=compute_type,
+                                            cpu_threads=self.budget.threads if self.budget else None)
+            self.engine_key = key
+        return self.engine
+
+    def handle(self, job):
+        """Run a single job and return the result message"""
+        job_id = job.get("id")
+        model_size = job.get("model", "base")
+        hf_token = job.get("hf_token") or os.getenv("HUGGINGFACE_TOKEN")
+
+        if self.budget:
+            # Other jobs may have started or finished since the last one
+            self.budget.acquire()
+            self.budget.refresh()
+            self.budget.apply_torch()
+
+        metrics = StageMetrics()
+        with metrics.stage("model_load"):
+            engine = self._get_engine(model_size, hf_token, job.get("compute_type"))
+            if self.budget:
+                # CTranslate2 keeps its load-time pool: a changed share reloads the model on CPU
+                engine.set_cpu_threads(self.budget.threads)
+        if job.get("cmd") == "load":
+            # Warm-up only: the caller is still downloading the audio
+            engine.preload(diarize=bool(job.get("diarize")))
+            return {"id": job_id, "event": "result", "success": True, "loaded": True, "model": model_size,
+                    "metrics": metrics.as_dict()}
+
+        speaker_names = _parse_speakers(job.get("speakers"))
+        print(f"DEBUG: [{job_id}] Starting transcription of {job['audio_file']}", file=sys.stderr)
+        _attach_events(engine, self._send, job_id)
+        try:
+            transcript, diarization_method = engine.transcribe_with_speakers(
+                job["audio_file"], speaker_names=speaker_names, pcm_cache_dir=job.get("pcm_cache"),
+                shards=int(job.get("shards") or 1), metrics=metrics, batch_size=job.get("batch_size"),
+                vad=bool(job.get("vad")), draft_model=job.get("draft_model"))
+        finally:
+            _detach_events(engine)
+        print(f"SUCCESS: [{job_id}] Transcribed {len(transcript)} segments", file=sys.stderr)
+        metrics.log(sys.stderr)
+        return {
+            "id": job_id,
+            "event": "result",
+            "success": True,
+            "model": model_size,
+            "device": engine.device,
+            "diarization_method": diarization_method,
+            "transcript": transcript.to_dict(),
+            "segment_count": len(transcript),
+            "metrics": metrics.as_dict()
+        }
+
+    def serve(self, stdin):
+        self._send({"ready": True, "pid": os.getpid()})
+        self._idle()
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                self._send({"success": False, "error": f"Invalid job line: {e}", "error_type": "JSONDecodeError"})
+                continue
+
+            if job.get("cmd") == "shutdown":
+                break
+
+            try:
+                self._send(self.handle(job))
+            except Exception as e:
+                fatal = _is_fatal(e)
+                print(f"ERROR: [{job.get('id')}] {e}", file=sys.stderr)
+                self._send({
+                    "id": job.get("id"),
+                    "event": "result",
+                    "success": False,
+                    "error": str(e),
+                    "error_type": type(e).__name__,
+                    "fatal": fatal
+                })
+                if fatal:
+                    # Exit so the client starts a fresh process for the next job
+                    sys.exit(3)
+                import gc
+                gc.collect()
+            self._idle()
+
+    def _idle(self):
+        """Between jobs: give up the thread lease so busy workers get the cores"""
+        if self.budget:
+            self.budget.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Isolated WhisperX transcription worker')
+    parser.add_argument('audio_file', nargs='?', help='Path to audio file')
+    parser.add_argument('--model', default='base', choices=['tiny', 'base', 'small', 'medium', 'large'])
+    parser.add_argument('--speakers', help='Speaker names (comma-separated)')
+    parser.add_argument('--hf-token', help='HuggingFace token')
+    parser.add_argument('--pcm-cache', help='Directory for memory-mapped decoded PCM (reused across runs)')
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help='Do not read or write the ~/.scriptotic stage result cache')
+    parser.add_argument('--window-seconds', type=float, default=600,
+                        help='Transcribe long audio in checkpointed windows of about this length (0 = off)')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='CPU only: transcribe long audio in this many parallel processes')
+    parser.add_argument('--batch-size', help='ASR batch size, or "auto" to tune it for this machine '
+                                             '(default: the tuned size if any, else 4 on GPU / 2 on CPU)')
+    parser.add_argument('--compute-type', choices=['auto', 'int8', 'int8_float32', 'float32', 'float16'],
+                        help='CTranslate2 precision (default: float16 on GPU, the tuned or int8 on CPU)')
+    parser.add_argument('--jobs', type=int,
+                        help='Concurrent jobs sharing this host\'s cores (default: count running workers)')
+    parser.add_argument('--vad', action='store_true',
+                        help='Only transcribe and diarize detected speech (skips silence and music)')
+    parser.add_argument('--draft-model', choices=['tiny', 'base'],
+                        help='Progressive mode: publish a quick draft with this model first, then refine')
+    parser.add_argument('--serve', action='store_true',
+                        help='Stay resident and read JSON-lines jobs from stdin')
+    parser.add_argument('--engine', help='Engine class as module:Class (default: WhisperXEngine; '
+                                         'benchmarks use benchmarks.stub_engine:StubEngine)')
+    
+    args = parser.parse_args()
+
+    # Claim a share of the cores before anything imports torch or CTranslate2
+    budget = ThreadBudget(jobs=args.jobs)
+    budget.apply_env()
+    print(f"DEBUG: Thread budget: {budget.threads} threads", file=sys.stderr)
+
+    if args.serve:
+        # stdout carries the protocol; send stray prints (engine DEBUG output) to stderr
+        protocol_out = sys.stdout
+        sys.stdout = sys.stderr
+        WorkerServer(protocol_out, None if args.no_result_cache else ResultStore(),
+                     window_seconds=args.window_seconds,
+                     engine_spec=args.engine, budget=budget).serve(sys.stdin)
+        return
+
+    if not args.audio_file:
+        parser.error("audio_file is required unless --serve is given")
+    run_once(args, budget)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -3,6 +3,7 @@
 Test WhisperX with GPU to confirm crash point
 """
 import os
+import sys
 
 print("Testing WhisperX with GPU...")
 
@@ -16,14 +17,15 @@ try:
     print("OK Model loaded successfully on GPU")
     
     # If we get here, check audio file
-    audio_file = "downloaded_audio.webm"
-    if os.path.exists(audio_file):
+    # Jobs download into their own temporary workspace, so pass any audio file
+    audio_file = sys.argv[1] if len(sys.argv) > 1 else None
+    if audio_file and os.path.exists(audio_file):
         print(f"OK Audio file found: {audio_file}")
         print("Starting GPU transcription (this might crash)...")
         result = model.transcribe(audio_file, batch_size=1)
         print(f"OK Transcription completed: {len(result['segments'])} segments")
     else:
-        print("ERROR Audio file not found")
+        print("ERROR No audio file - usage: python test_gpu.py <audio file>")
         
 except Exception as e:
     print(f"ERROR: {e}")
@@ -20,8 +20,9 @@ try:
     print("OK Model loaded successfully")
     
     # Test 2: Check if audio file exists
-    audio_file = "downloaded_audio.webm"
-    if os.path.exists(audio_file):
+    # Jobs download into their own temporary workspace, so pass any audio file
+    audio_file = sys.argv[1] if len(sys.argv) > 1 else None
+    if audio_file and os.path.exists(audio_file):
         print(f"OK Audio file found: {audio_file}")
         
         # Test 3: Basic transcription (CPU, small batch)
@@ -33,7 +34,7 @@ try:
         if result['segments']:
             print(f"First segment: {result['segments'][0]['text'][:50]}...")
     else:
-        print("ERROR Audio file not found - please run main app first to download audio")
+        print("ERROR No audio file - usage: python test_minimal.py <audio file>")
         
 except Exception as e:
     print(f"ERROR: {e}")